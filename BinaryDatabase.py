@@ -0,0 +1,215 @@
+import itertools
+import mmap
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"HEXBDB\x00\x00"
+VERSION = 1
+
+# magic, version, board_size, key_bytes, num_entries, flags
+_HEADER = struct.Struct("<8sHHIQI")
+HEADER_SIZE = 32
+
+# flags: the keys are canonical (see board.canonical_key). Files written before the flag
+# existed have zero padding there, so they read as plain keys.
+FLAG_CANONICAL = 1
+
+
+def key_bytes_for_size(board_size):
+    """Fixed key width in bytes: 2 bits per cell (see board.grid_to_key)"""
+    return (2 * board_size * board_size + 7) // 8
+
+
+class BinaryDatabase:
+    """
+    Read-only board database in the binary on-disk format, opened with mmap.
+
+    File layout (little endian):
+        header   32 bytes: magic, version u16, board_size u16, key_bytes u32, num_entries u64,
+                 flags u32 (FLAG_CANONICAL)
+        scores   float32[num_entries]
+        counts   uint32[num_entries]
+        keys     num_entries fixed-width big-endian keys, sorted ascending
+
+    Big-endian keys of a fixed width sort bytewise in the same order as the int
+    keys, so a lookup is a binary search over the mapped key block. Nothing is
+    read into memory up front; the OS pages in the parts a search touches.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = str(filepath)
+        self._file = open(self.filepath, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER_SIZE:
+            self.close()
+            raise ValueError(f"Not a board database: {self.filepath}")
+
+        magic, version, board_size, key_bytes, num_entries, flags = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not a board database: {self.filepath}")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported board database version {version} in {self.filepath}")
+
+        self.version = version
+        self.board_size = board_size
+        self.key_bytes = key_bytes
+        self.canonical = bool(flags & FLAG_CANONICAL)
+        self._num_entries = num_entries
+
+        offset = HEADER_SIZE
+        self.scores = np.frombuffer(self._mmap, dtype="<f4", count=num_entries, offset=offset)
+        offset += 4 * num_entries
+        self.counts = np.frombuffer(self._mmap, dtype="<u4", count=num_entries, offset=offset)
+        offset += 4 * num_entries
+        self.keys = np.frombuffer(self._mmap, dtype=f"S{key_bytes}", count=num_entries, offset=offset)
+
+    # ---------- Writing ----------
+    @staticmethod
+    def write(filepath, board_database, board_size, canonical=True):
+        """
+        Write a {int key: [score, count]} database in the binary format
+
+        Args:
+            filepath: output file
+            board_database: dict of int keys
+            board_size: board size the keys belong to
+            canonical: the keys are canonical keys (recorded in the header)
+
+        Returns:
+            int: number of entries written
+        """
+        key_bytes = key_bytes_for_size(board_size)
+        keys = sorted(board_database)
+
+        scores = np.fromiter((board_database[k][0] for k in keys), dtype="<f4", count=len(keys))
+        counts = np.fromiter((board_database[k][1] for k in keys), dtype="<u4", count=len(keys))
+        packed = np.array([k.to_bytes(key_bytes, "big") for k in keys], dtype=f"S{key_bytes}")
+
+        with open(filepath, "wb") as f:
+            header = _HEADER.pack(MAGIC, VERSION, board_size, key_bytes, len(keys),
+                                  FLAG_CANONICAL if canonical else 0)
+            f.write(header.ljust(HEADER_SIZE, b"\x00"))
+            f.write(scores.tobytes())
+            f.write(counts.tobytes())
+            f.write(packed.tobytes())
+
+        return len(keys)
+
+    @staticmethod
+    def write_sorted(filepath, entries, board_size, block_size=65536, canonical=True):
+        """
+        Write a database in the binary format from a stream, without holding it in memory.
+        The scores go straight to the file, counts and keys are spilled to temporary
+        files and appended once the number of entries is known.
+
+        Args:
+            filepath: output file
+            entries: iterable of (int key, score, count) in strictly ascending key order
+            board_size: board size the keys belong to
+            block_size: entries converted per numpy block
+            canonical: the keys are canonical keys (recorded in the header)
+
+        Returns:
+            int: number of entries written
+        """
+        key_bytes = key_bytes_for_size(board_size)
+        num_entries = 0
+        last_key = -1
+
+        with open(filepath, "wb") as f, tempfile.TemporaryFile() as counts_file, \
+                tempfile.TemporaryFile() as keys_file:
+            f.write(b"\x00" * HEADER_SIZE)
+
+            entries = iter(entries)
+            while True:
+                block = list(itertools.islice(entries, block_size))
+                if not block:
+                    break
+                keys, scores, counts = zip(*block)
+                if keys[0] <= last_key or any(a >= b for a, b in zip(keys, keys[1:])):
+                    raise ValueError("write_sorted needs strictly ascending keys")
+                last_key = keys[-1]
+
+                f.write(np.array(scores, dtype="<f4").tobytes())
+                counts_file.write(np.array(counts, dtype="<u4").tobytes())
+                keys_file.write(b"".join(k.to_bytes(key_bytes, "big") for k in keys))
+                num_entries += len(block)
+
+            for spilled in (counts_file, keys_file):
+                spilled.seek(0)
+                shutil.copyfileobj(spilled, f)
+
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, board_size, key_bytes, num_entries,
+                                 FLAG_CANONICAL if canonical else 0))
+
+        return num_entries
+
+    # ---------- Lookups ----------
+    def _encode(self, key):
+        return int(key).to_bytes(self.key_bytes, "big")
+
+    def _index(self, key):
+        """row of key in the file, or -1"""
+        needle = self._encode(key)
+        i = int(np.searchsorted(self.keys, needle))
+        if i < self._num_entries and self.keys[i] == needle.rstrip(b"\x00"):
+            return i
+        return -1
+
+    def get(self, key, default=None):
+        """
+        :param key: int key
+        :return: [score, count] or default
+        """
+        i = self._index(key)
+        if i < 0:
+            return default
+        return [float(self.scores[i]), int(self.counts[i])]
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self._index(key) >= 0
+
+    def __len__(self):
+        return self._num_entries
+
+    def items(self):
+        """generator of (int key, [score, count]) in key order"""
+        for i in range(self._num_entries):
+            key = int.from_bytes(self._mmap[self._key_offset(i):self._key_offset(i) + self.key_bytes], "big")
+            yield key, [float(self.scores[i]), int(self.counts[i])]
+
+    def _key_offset(self, i):
+        return HEADER_SIZE + 8 * self._num_entries + i * self.key_bytes
+
+    def to_dict(self):
+        return dict(self.items())
+
+    # ---------- Resource handling ----------
+    def close(self):
+        # numpy views keep the mmap exported, drop them first
+        self.scores = self.counts = self.keys = None
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from BinaryDatabase import BinaryDatabase
+
+_NOT_CACHED = object()
+
+
+class DatabaseBackend:
+    """
+    Read-only lookup interface over a board database {int key: [score, count]}.
+    Players only use get/get_many, so the data can live in memory or on disk.
+    """
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def get_many(self, keys, default=None):
+        """
+        Batched lookup
+        :param keys: iterable of int keys
+        :param default: value for missing keys
+        :return: list of [score, count] (or default), in the order of keys
+        """
+        return [self.get(key, default) for key in keys]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class DictBackend(DatabaseBackend):
+    """Whole database held in a dict (what DatabaseHandler.load_board_database returns)"""
+
+    def __init__(self, board_database):
+        self.board_database = board_database
+
+    def get(self, key, default=None):
+        return self.board_database.get(key, default)
+
+    def get_many(self, keys, default=None):
+        get = self.board_database.get
+        return [get(key, default) for key in keys]
+
+    def __len__(self):
+        return len(self.board_database)
+
+
+class BinaryBackend(DatabaseBackend):
+    """
+    On-disk database in the BinaryDatabase format.
+    The file is mmap-ed so the OS pages in only what lookups touch, and decoded
+    entries (and known misses) go through an LRU cache of at most cache_size items,
+    so memory stays bounded whatever the size of the file.
+    """
+
+    def __init__(self, filepath, cache_size=100_000):
+        self.filepath = str(filepath)
+        self.cache_size = cache_size
+        self._database = BinaryDatabase(filepath)
+        self.canonical = self._database.canonical
+        self._cache = OrderedDict()
+
+    def get(self, key, default=None):
+        return self.get_many([key], default)[0]
+
+    def get_many(self, keys, default=None):
+        keys = list(keys)
+        values = [None] * len(keys)
+        cache = self._cache
+
+        misses = []
+        for i, key in enumerate(keys):
+            value = cache.get(key, _NOT_CACHED)
+            if value is not _NOT_CACHED:
+                cache.move_to_end(key)
+                values[i] = value
+            else:
+                misses.append(i)
+
+        database = self._database
+        if misses and len(database):
+            # one vectorized binary search for all the misses
+            needles = np.array([database._encode(keys[i]) for i in misses], dtype=database.keys.dtype)
+            rows = np.minimum(np.searchsorted(database.keys, needles), len(database) - 1)
+            found = (database.keys[rows] == needles).tolist()
+            scores = database.scores[rows].tolist()
+            counts = database.counts[rows].tolist()
+
+            for j, i in enumerate(misses):
+                value = [scores[j], counts[j]] if found[j] else None
+                values[i] = value
+                cache[keys[i]] = value
+
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+        return [default if value is None else value for value in values]
+
+    def __len__(self):
+        return len(self._database)
+
+    def close(self):
+        self._database.close()
+
+    def __getstate__(self):
+        # an mmap can't be pickled, worker processes reopen the file instead
+        return {'filepath': self.filepath, 'cache_size': self.cache_size}
+
+    def __setstate__(self, state):
+        self.__init__(state['filepath'], state['cache_size'])
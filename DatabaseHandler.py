@@ -1,6 +1,21 @@
 import json
+import math
 from pathlib import Path
 
+from board import legacy_key_to_key, key_to_grid, canonical_key
+from BinaryDatabase import BinaryDatabase, MAGIC
+from gamerecord import moves_to_dicts
+from DatabaseBackend import DictBackend, BinaryBackend
+import DatabaseMerge
+
+# process-wide registry: every player asking for the same file shares one backend
+_open_backends = {}
+
+# marker entry of JSON databases with canonical keys (see board.canonical_key); databases
+# without it were written with plain keys (or str(list) keys) and are migrated on load
+FORMAT_KEY = "format"
+CANONICAL_FORMAT = "canonical"
+
 class DatabaseHandler:
     @staticmethod
     def save_games_to_json(results, filename="Hex_database_result.json"):
@@ -21,6 +36,10 @@ class DatabaseHandler:
 
         filepath = output_dir / filename
 
+        # Move arrays are written out as the readable list of move dicts
+        results = [dict(r, moves=moves_to_dicts(r['moves'], r['board_size']))
+                   if not isinstance(r['moves'], list) else r for r in results]
+
         # Add metadata
         data = {
             'metadata': {
@@ -46,7 +65,9 @@ class DatabaseHandler:
     @staticmethod
     def save_board_database(board_database, filename="Hex_database_games.json"):
         """
-        Save board database to JSON file in the exact format: {"[0,0,0,...]": [score, count]}
+        Save board database to JSON file in the format: {"<int key>": [score, count]}
+        (JSON object keys are strings, the int keys are written in decimal).
+        The keys must be canonical keys; the file starts with the "format": "canonical" marker.
 
         Args:
             board_database: Dictionary of board states with scores
@@ -64,33 +85,275 @@ class DatabaseHandler:
 
         # Save directly as the board database without metadata wrapper
         with open(filepath, 'w') as f:
-            json.dump(board_database, f)
+            json.dump({FORMAT_KEY: CANONICAL_FORMAT, **board_database}, f)
 
         print(f"\nSaved {len(board_database)} unique board states to {filepath}")
 
         return str(filepath)
 
     @staticmethod
-    def load_board_database(filename):
+    def load_board_database(filename, board_size=None):
         """
-        Load a board database from game_database/<filename>
+        Load a board database from game_database/<filename>, with canonical keys.
+        Legacy str(list) keys are canonicalized on the fly (the list length gives the board
+        size); plain int keys of a file without the canonical marker need board_size.
 
         Args:
             filename: Name of the JSON file (e.g. "Hex_database_games.json")
+            board_size: board size, to migrate a database with plain int keys
 
         Returns:
             dict: {board_key: [avg_score, count]}
         """
-        base_dir = Path("game_database")
-        filepath = base_dir / filename
+        filepath = Path("game_database") / filename
 
         if not filepath.exists():
             raise FileNotFoundError(f"Database file not found: {filepath}")
 
-        with open(filepath, "r") as f:
-            board_database = json.load(f)
+        board_database, legacy_size, canonical = DatabaseHandler._read_entries(filepath)
+        if not canonical:
+            board_size = legacy_size or board_size
+            if board_size is None:
+                raise ValueError(f"{filepath} has plain (not canonical) keys, pass its board_size or "
+                                 f"migrate it with DatabaseHandler.canonicalize_database")
+            board_database = DatabaseHandler.canonicalize(board_database, board_size)
 
         print(f"Loaded {len(board_database)} board states from {filepath}")
         return board_database
 
+    @staticmethod
+    def _read_entries(filepath):
+        """
+        Read a JSON database as stored
+
+        Returns:
+            tuple: ({int key: [score, count]}, board size of str(list) keys or None,
+                    True if the file has the canonical marker)
+        """
+        with open(filepath, "r") as f:
+            raw_database = json.load(f)
+
+        canonical = raw_database.pop(FORMAT_KEY, None) == CANONICAL_FORMAT
+        board_database, legacy_size = DatabaseHandler._decode_keys(raw_database)
+        if legacy_size is not None and canonical:
+            raise ValueError(f"{filepath} mixes str(list) keys with canonical keys")
+        return board_database, legacy_size, canonical
+
+    @staticmethod
+    def open_database(filename, cache_size=100_000, board_size=None):
+        """
+        Open game_database/<filename> as a shared lookup backend, keyed by canonical keys.
+        Binary files (see BinaryDatabase) are read on demand from disk with a bounded
+        LRU cache, JSON files are loaded into memory once. Every later call for the
+        same file (any player, any colour) gets the same backend.
+        Binary files without canonical keys are rejected (see canonicalize_database).
+
+        Args:
+            filename: JSON or binary database file
+            cache_size: LRU size for on-disk databases
+            board_size: board size, to migrate a JSON database with plain int keys
+
+        Returns:
+            DatabaseBackend: object with get(key) / get_many(keys)
+        """
+        filepath = (Path("game_database") / filename).resolve()
+
+        backend = _open_backends.get(filepath)
+        if backend is not None:
+            return backend
+
+        if not filepath.exists():
+            raise FileNotFoundError(f"Database file not found: {filepath}")
+
+        with open(filepath, "rb") as f:
+            is_binary = f.read(len(MAGIC)) == MAGIC
+
+        if is_binary:
+            backend = BinaryBackend(filepath, cache_size)
+            if not backend.canonical:
+                backend.close()
+                raise ValueError(f"{filepath} has plain (not canonical) keys, "
+                                 f"migrate it with DatabaseHandler.canonicalize_database")
+            print(f"Opened {len(backend)} board states from {filepath}")
+        else:
+            backend = DictBackend(DatabaseHandler.load_board_database(filename, board_size))
+
+        _open_backends[filepath] = backend
+        return backend
+
+    @staticmethod
+    def close_databases():
+        """Forget every shared backend, closing the on-disk ones"""
+        for backend in _open_backends.values():
+            if isinstance(backend, BinaryBackend):
+                backend.close()
+        _open_backends.clear()
+
+    @staticmethod
+    def convert_legacy_database(src_filename, dst_filename):
+        """
+        Rewrite an old database keyed by str(list) ("[0, 1, ...]") with the compact canonical
+        int keys. Both files live in game_database/.
+
+        Args:
+            src_filename: legacy JSON database
+            dst_filename: output JSON database
+
+        Returns:
+            str: Path to saved file
+        """
+        board_database = DatabaseHandler.load_board_database(src_filename)
+        return DatabaseHandler.save_board_database(board_database, filename=dst_filename)
+
+    @staticmethod
+    def canonicalize_database(src_filename, dst_filename, board_size=7):
+        """
+        Rewrite a database with canonical (symmetry class) keys, see board.canonical_key.
+        Entries of the same class are merged with count-weighted averaging.
+        Both files live in game_database/; binary input gives binary output.
+
+        Args:
+            src_filename: JSON database with plain or legacy keys, or a binary database
+            dst_filename: output database
+            board_size: board size of the positions (binary files carry their own)
+
+        Returns:
+            dict: statistics (entries before/after, merged classes)
+        """
+        src = Path("game_database") / src_filename
+        if not src.exists():
+            raise FileNotFoundError(f"Database file not found: {src}")
+
+        with open(src, "rb") as f:
+            is_binary = f.read(len(MAGIC)) == MAGIC
+
+        if is_binary:
+            with BinaryDatabase(src) as database:
+                board_database = database.to_dict()
+                board_size = database.board_size
+        else:
+            board_database, legacy_size, _ = DatabaseHandler._read_entries(src)
+            board_size = legacy_size or board_size
+
+        canonical = DatabaseHandler.canonicalize(board_database, board_size)
+        if is_binary:
+            DatabaseHandler.save_binary_database(canonical, board_size, filename=dst_filename)
+        else:
+            DatabaseHandler.save_board_database(canonical, filename=dst_filename)
+
+        stats = {
+            'entries_before': len(board_database),
+            'entries_after': len(canonical),
+            'merged': len(board_database) - len(canonical)
+        }
+        print(f"Canonicalized {stats['entries_before']} -> {stats['entries_after']} board states")
+        return stats
+
+    @staticmethod
+    def canonicalize(board_database, board_size):
+        """
+        {key: [score, count]} -> {canonical key: [score, count]}, merging entries of one
+        class with count-weighted averaging (canonical keys map to themselves)
+        """
+        score_sums = {}
+        counts = {}
+        for key, (score, count) in board_database.items():
+            key = canonical_key(key_to_grid(key, board_size))
+            score_sums[key] = score_sums.get(key, 0.0) + score * count
+            counts[key] = counts.get(key, 0) + count
+
+        return {key: [score_sums[key] / counts[key], counts[key]] for key in counts}
+
+    @staticmethod
+    def _decode_keys(raw_database):
+        """
+        JSON keys -> int keys, legacy "[0, 1, ...]" keys are converted to plain keys on the fly
+        :return: ({int key: [score, count]}, board size of the legacy keys or None)
+        """
+        board_database = {}
+        legacy_size = None
+        for key, value in raw_database.items():
+            if key.startswith("["):
+                size = math.isqrt(key.count(",") + 1)
+                if legacy_size not in (None, size):
+                    raise ValueError("str(list) keys of different board sizes")
+                legacy_size = size
+                key = legacy_key_to_key(key)
+            else:
+                key = int(key)
+            board_database[key] = value
+        return board_database, legacy_size
+
+    @staticmethod
+    def save_binary_database(board_database, board_size, filename="Hex_database_games.hexdb"):
+        """
+        Save board database in the binary format (see BinaryDatabase)
+
+        Args:
+            board_database: {int key: [score, count]}
+            board_size: board size of the positions
+            filename: Output filename
+
+        Returns:
+            str: Path to saved file
+        """
+        output_dir = Path("game_database")
+        output_dir.mkdir(exist_ok=True)
+
+        filepath = output_dir / filename
+        count = BinaryDatabase.write(filepath, board_database, board_size)
+
+        print(f"\nSaved {count} unique board states to {filepath}")
+
+        return str(filepath)
+
+    @staticmethod
+    def open_binary_database(filename):
+        """
+        Open game_database/<filename> with mmap, nothing is loaded up front
 
+        Returns:
+            BinaryDatabase: read-only mapping of {int key: [score, count]}
+        """
+        filepath = Path("game_database") / filename
+
+        if not filepath.exists():
+            raise FileNotFoundError(f"Database file not found: {filepath}")
+
+        return BinaryDatabase(filepath)
+
+    @staticmethod
+    def convert_json_to_binary(json_filename, binary_filename, board_size):
+        """
+        Convert a JSON board database to the binary format, both in game_database/
+
+        Returns:
+            str: Path to saved file
+        """
+        board_database = DatabaseHandler.load_board_database(json_filename, board_size)
+        return DatabaseHandler.save_binary_database(board_database, board_size, binary_filename)
+
+    @staticmethod
+    def merge_databases(input_filenames, output_filename, board_size, workers=1, run_size=1_000_000):
+        """
+        Merge databases into one with count-weighted average scores, as a streaming
+        k-way merge with bounded memory (see DatabaseMerge.merge_databases)
+
+        Returns:
+            dict: number of inputs, sorted runs and merged entries
+        """
+        return DatabaseMerge.merge_databases(input_filenames, output_filename, board_size, workers, run_size)
+
+    @staticmethod
+    def convert_binary_to_json(binary_filename, json_filename):
+        """
+        Convert a binary board database back to JSON, both in game_database/
+
+        Returns:
+            str: Path to saved file
+        """
+        with DatabaseHandler.open_binary_database(binary_filename) as database:
+            board_database = database.to_dict()
+            if not database.canonical:
+                board_database = DatabaseHandler.canonicalize(board_database, database.board_size)
+        return DatabaseHandler.save_board_database(board_database, filename=json_filename)
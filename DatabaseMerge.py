@@ -0,0 +1,227 @@
+"""
+Merge board databases that don't fit in memory.
+
+    python -m DatabaseMerge merged.hexdb random.json greedy.json heuristic.hexdb --board-size 7
+
+Every input (JSON or binary, in game_database/) is turned into sorted runs of
+at most run_size entries, holding exact score sums (score * count) and counts.
+Keys of JSON inputs without the canonical marker are canonicalized on the way;
+binary inputs must have canonical keys (see DatabaseHandler.canonicalize_database).
+Binary inputs are sorted already and are read in place; JSON inputs are parsed
+incrementally and sorted run by run, optionally in parallel over the inputs.
+A streaming k-way merge over all runs then adds up the sums and counts of equal
+keys, so every merged score is the count-weighted average of the inputs.
+Peak memory is one run per pre-sort worker plus one block per run during the merge.
+"""
+import argparse
+import heapq
+import json
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from BinaryDatabase import BinaryDatabase, MAGIC, key_bytes_for_size
+from board import legacy_key_to_key, key_to_grid, canonical_key
+
+# one '"key": [score, count]' entry of a JSON database, keys are ints or legacy "[0, 1, ...]" lists
+_JSON_ENTRY = re.compile(r'"(\d+|\[[^\]]*\])"\s*:\s*\[\s*([^,\]\s]+)\s*,\s*([^\]\s]+)\s*\]')
+
+# the "format": "canonical" marker save_board_database writes first (see DatabaseHandler)
+_CANONICAL_MARKER = re.compile(r'^\s*\{\s*"format"\s*:\s*"canonical"')
+
+_READ_SIZE = 1 << 20
+_BLOCK_SIZE = 65536
+
+
+def _is_binary(filepath):
+    with open(filepath, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _has_canonical_marker(filepath):
+    with open(filepath) as f:
+        return _CANONICAL_MARKER.match(f.read(256)) is not None
+
+
+def iter_json_entries(filepath, board_size=None):
+    """
+    Stream (int key, score, count) out of a JSON database without loading it
+    :param board_size: canonicalize the keys of positions of this size (None: keys as stored)
+    """
+    with open(filepath) as f:
+        buffer = ""
+        while True:
+            chunk = f.read(_READ_SIZE)
+            buffer += chunk
+            end = 0
+            for match in _JSON_ENTRY.finditer(buffer):
+                key, score, count = match.groups()
+                key = legacy_key_to_key(key) if key.startswith("[") else int(key)
+                if board_size is not None:
+                    key = canonical_key(key_to_grid(key, board_size))
+                yield key, float(score), int(count)
+                end = match.end()
+            buffer = buffer[end:]
+            if not chunk:
+                return
+
+
+def _write_run(entries, key_bytes, prefix):
+    """sort entries by key and save them as the run <prefix>.{keys,sums,counts}.npy"""
+    entries.sort()
+    keys, scores, counts = zip(*entries)
+    counts = np.array(counts, dtype=np.int64)
+    packed = np.frombuffer(b"".join(k.to_bytes(key_bytes, "big") for k in keys), dtype=np.uint8)
+
+    np.save(f"{prefix}.keys.npy", packed.reshape(len(keys), key_bytes))
+    np.save(f"{prefix}.sums.npy", np.array(scores, dtype=np.float64) * counts)
+    np.save(f"{prefix}.counts.npy", counts)
+
+
+def presort(filepath, key_bytes, run_size, prefix, board_size=None):
+    """
+    Split a JSON database into sorted runs of at most run_size entries
+    (keys can repeat within a run after canonicalization, the merge adds them up)
+    :param board_size: canonicalize the keys, see iter_json_entries
+    :return: list of the runs' path prefixes, <prefix>_<run number>
+    """
+    runs = []
+    entries = []
+    for entry in iter_json_entries(filepath, board_size):
+        entries.append(entry)
+        if len(entries) >= run_size:
+            runs.append(f"{prefix}_{len(runs)}")
+            _write_run(entries, key_bytes, runs[-1])
+            entries = []
+    if entries:
+        runs.append(f"{prefix}_{len(runs)}")
+        _write_run(entries, key_bytes, runs[-1])
+    return runs
+
+
+def _iter_run(prefix):
+    """(key, score sum, count) of a run, read block by block from its mmap-ed .npy files"""
+    keys, sums, counts = (np.load(f"{prefix}.{name}.npy", mmap_mode="r") for name in ("keys", "sums", "counts"))
+    key_bytes = keys.shape[1]
+    for start in range(0, len(keys), _BLOCK_SIZE):
+        raw = keys[start:start + _BLOCK_SIZE].tobytes()
+        block_keys = [int.from_bytes(raw[i:i + key_bytes], "big") for i in range(0, len(raw), key_bytes)]
+        yield from zip(block_keys, sums[start:start + _BLOCK_SIZE].tolist(),
+                       counts[start:start + _BLOCK_SIZE].tolist())
+
+
+def _iter_binary(filepath):
+    """(key, score sum, count) of a binary database, read block by block from the mmap"""
+    with BinaryDatabase(filepath) as database:
+        key_bytes = database.key_bytes
+        for start in range(0, len(database), _BLOCK_SIZE):
+            stop = min(start + _BLOCK_SIZE, len(database))
+            raw = database._mmap[database._key_offset(start):database._key_offset(stop)]
+            block_keys = [int.from_bytes(raw[i:i + key_bytes], "big") for i in range(0, len(raw), key_bytes)]
+            counts = database.counts[start:stop].astype(np.int64)
+            sums = database.scores[start:stop].astype(np.float64) * counts
+            yield from zip(block_keys, sums.tolist(), counts.tolist())
+
+
+def merge_entries(sources):
+    """
+    k-way merge of sorted (key, score sum, count) streams
+    :return: generator of (key, count-weighted average score, total count) in key order
+    """
+    current = None
+    total_sum = 0.0
+    total_count = 0
+    for key, score_sum, count in heapq.merge(*sources, key=lambda entry: entry[0]):
+        if key != current:
+            if total_count:
+                yield current, total_sum / total_count, total_count
+            current, total_sum, total_count = key, 0.0, 0
+        total_sum += score_sum
+        total_count += count
+    if total_count:
+        yield current, total_sum / total_count, total_count
+
+
+def _write_json(filepath, entries):
+    """stream entries into the {"<key>": [score, count]} format of save_board_database"""
+    num_entries = 0
+    with open(filepath, "w") as f:
+        f.write('{"format": "canonical"')
+        for key, score, count in entries:
+            f.write(f', "{key}": [{json.dumps(score)}, {count}]')
+            num_entries += 1
+        f.write("}")
+    return num_entries
+
+
+def merge_databases(input_filenames, output_filename, board_size, workers=1, run_size=1_000_000):
+    """
+    Merge databases of game_database/ into one with count-weighted average scores.
+
+    Args:
+        input_filenames: JSON or binary databases in game_database/
+        output_filename: merged database in game_database/, binary unless it ends in .json
+        board_size: board size of the positions
+        workers: processes sorting the JSON inputs in parallel
+        run_size: maximum entries held in memory per sorted run
+
+    Returns:
+        dict: number of inputs, sorted runs and merged entries
+    """
+    base_dir = Path("game_database")
+    inputs = [base_dir / filename for filename in input_filenames]
+    for filepath in inputs:
+        if not filepath.exists():
+            raise FileNotFoundError(f"Database file not found: {filepath}")
+
+    output = base_dir / output_filename
+    key_bytes = key_bytes_for_size(board_size)
+    binary_inputs = [filepath for filepath in inputs if _is_binary(filepath)]
+    json_inputs = [filepath for filepath in inputs if filepath not in binary_inputs]
+    for filepath in binary_inputs:
+        with BinaryDatabase(filepath) as database:
+            if database.board_size != board_size:
+                raise ValueError(f"{filepath} holds size {database.board_size} positions, not {board_size}")
+            if not database.canonical:
+                raise ValueError(f"{filepath} has plain (not canonical) keys, "
+                                 f"migrate it with DatabaseHandler.canonicalize_database")
+
+    with tempfile.TemporaryDirectory(dir=base_dir) as directory:
+        args = [(filepath, key_bytes, run_size, f"{directory}/input{i}",
+                 None if _has_canonical_marker(filepath) else board_size)
+                for i, filepath in enumerate(json_inputs)]
+        if workers > 1 and len(json_inputs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                run_lists = list(pool.map(presort, *zip(*args)))
+        else:
+            run_lists = [presort(*arg) for arg in args]
+        runs = [run for run_list in run_lists for run in run_list]
+
+        sources = [_iter_run(run) for run in runs] + [_iter_binary(filepath) for filepath in binary_inputs]
+        merged = merge_entries(sources)
+        if output.suffix == ".json":
+            num_entries = _write_json(output, merged)
+        else:
+            num_entries = BinaryDatabase.write_sorted(output, merged, board_size)
+
+    print(f"Merged {len(inputs)} databases ({len(runs)} sorted runs) into {num_entries} board states in {output}")
+    return {'inputs': len(inputs), 'runs': len(runs), 'entries': num_entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="merged database in game_database/ (.json or binary)")
+    parser.add_argument("inputs", nargs="+", help="databases in game_database/")
+    parser.add_argument("--board-size", type=int, required=True)
+    parser.add_argument("--workers", type=int, default=1, help="processes for the pre-sort")
+    parser.add_argument("--run-size", type=int, default=1_000_000, help="entries per sorted run")
+    args = parser.parse_args()
+
+    merge_databases(args.inputs, args.output, args.board_size, args.workers, args.run_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,85 @@
-from board import Board, RED, BLUE
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from board import Board, RED, BLUE, canonical_key
 from player import RandomAI
 from game import Game
+from bitboard import BitBoard
+from selfplay import play_random_games, result_from_moves
+from gamerecord import replay_keys
+from accumulator import ScoreAccumulator
+from checkpoint import Checkpoint
+import instrumentation
+
+# players of the current worker process, set once by _init_worker
+_worker_players = None
+
+
+def _init_worker(red_player, blue_player):
+    global _worker_players
+    _worker_players = {RED: red_player, BLUE: blue_player}
+
+
+def _chunk_seed(seed, chunk_index):
+    """Independent 32-bit seed for one chunk of games"""
+    return int(np.random.SeedSequence([seed, chunk_index]).generate_state(1)[0])
+
+
+def _iter_games(board_size, players, first_game, num_games, engine, seed, verbose):
+    """Generator of game results for one chunk, played by the requested engine"""
+    if engine == 'batch':
+        yield from play_random_games(num_games, board_size, rng=np.random.default_rng(seed))
+        return
+
+    if engine == 'rollout':
+        for _ in range(num_games):
+            yield Tournament.random_rollout(board_size)
+        return
+
+    game = Game(board_size, players[RED], players[BLUE])
+    for i in range(first_game, first_game + num_games):
+        game.reset_game()
+        yield game.play(verbose=verbose and i == 1)  # print only the first game
+
+
+def _play_chunk(board_size, gamma, first_game, num_games, total_games, seed, verbose, engine,
+                players=None):
+    """
+    Play one chunk of games and accumulate a local database shard.
+    Runs either in the parent (serial mode) or in a pool worker.
+
+    Returns:
+        tuple: (results list, shard ScoreAccumulator)
+    """
+    if players is None:
+        players = _worker_players
+
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    results = []
+    shard = ScoreAccumulator()
+
+    games = _iter_games(board_size, players, first_game, num_games, engine, seed, verbose)
+
+    for i, result in enumerate(games, start=first_game):
+        if verbose or (i + 1) % 10_000 == 0:
+            print(f"Played game {i + 1}/{total_games}...")
+
+        result['game_number'] = i + 1
+
+        # Scores of all board states in this game, replayed from its moves and added in batches
+        shard.add_game(result['moves'], result['winner'], board_size, gamma)
+        results.append(result)
+
+    shard.flush()
+    return results, shard
+
 
 class Tournament:
     """Run a Hex game without GUI for fast simulation"""
@@ -24,16 +103,39 @@ class Tournament:
             BLUE: blue_player_class
         }
 
-        self.board_database = {}
+        self.scores = ScoreAccumulator()  # exact score sums and counts
+        self._board_database = None  # averages built from scores on demand
+        self.winners = {'RED': 0, 'BLUE': 0, 'Tie': 0}  # of the last run
+
+    @property
+    def board_database(self):
+        """{board_key: [average score, count]} of every position seen so far"""
+        if self._board_database is None:
+            self._board_database = self.scores.to_database()
+        return self._board_database
 
     @staticmethod
     def board_to_key(board_array):
-        """Convert a board numpy array to a JSON string key like [0,0,0,...]"""
-        # Flatten the 2D board to 1D and convert to list
-        return str(board_array.flatten().tolist())
+        """
+        Convert a board numpy array to the compact int key of its symmetry class
+        (see board.canonical_key), so a position and its 180 degree rotation share one entry
+        """
+        return canonical_key(board_array)
 
     @staticmethod
-    def calculate_board_scores(board_states, winner, gamma=0.9):
+    def random_rollout(board_size):
+        """
+        Play one RandomAI vs RandomAI game as a random fill of the board
+        (see BitBoard.rollout_game), without a win check after every ply.
+
+        Returns:
+            dict: same result format as Game.play
+        """
+        winner, moves = BitBoard(board_size).rollout_game(RED)
+        return result_from_moves([r * board_size + c for r, c in moves], winner, board_size)
+
+    @staticmethod
+    def calculate_board_scores(board_states, winner, gamma=0.9, board_keys=None):
         """
         Calculate scores for all board states in a game
 
@@ -41,10 +143,34 @@ class Tournament:
             board_states: List of board state numpy arrays
             winner: 'RED', 'BLUE', or 'TIE'
             gamma: Discount factor (default 0.9)
+            board_keys: keys of the states if already known
 
         Returns:
             dict: {board_key: score} for each board state
         """
+        if board_keys is None:
+            board_keys = (Tournament.board_to_key(board_state) for board_state in board_states)
+        return Tournament._discounted_scores(board_keys, len(board_states), winner, gamma)
+
+    @staticmethod
+    def calculate_move_scores(moves, winner, board_size, gamma=0.9):
+        """
+        calculate_board_scores for a game recorded as a move array (see gamerecord):
+        the keys of the positions are replayed one move at a time, so no board states are kept
+
+        Args:
+            moves: flat cells of the moves, RED first
+            winner: 'RED', 'BLUE', or 'TIE'
+            board_size: board size
+            gamma: Discount factor (default 0.9)
+
+        Returns:
+            dict: {board_key: score} for the position before every move
+        """
+        return Tournament._discounted_scores(replay_keys(moves, board_size), len(moves), winner, gamma)
+
+    @staticmethod
+    def _discounted_scores(board_keys, N, winner, gamma):
         # Determine outcome
         if winner == 'TIE':
             outcome = 0.1
@@ -53,73 +179,190 @@ class Tournament:
         else:  # BLUE wins
             outcome = 1.0
 
-        N = len(board_states)
         board_scores = {}
-
-        for i, board_state in enumerate(board_states):
+        for i, board_key in enumerate(board_keys):
             # Calculate score: outcome * gamma^(N-i-1)
-            score = outcome * (gamma ** (N - i - 1))
-            board_key = Tournament.board_to_key(board_state)
-            board_scores[board_key] = score
+            board_scores[board_key] = outcome * (gamma ** (N - i - 1))
 
         return board_scores
 
 
-    def run_multiple_games(self, verbose=False):
+    def run_multiple_games(self, verbose=False, workers=1, seed=None, chunk_size=500, engine='game',
+                           sinks=(), keep_results=True, checkpoint=None, resume=False, compact_every=20):
         """
-        Run multiple games and collect results
+        Run multiple games and collect results (see iter_games for the streaming version)
 
         Args:
-            verbose: Print game progress
+            verbose, workers, seed, chunk_size, engine, sinks,
+            checkpoint, resume, compact_every: see iter_games
+            keep_results: keep every result dict in the returned list; with False the list
+                          is empty and memory stays constant however many games are played
 
         Returns:
             tuple: (results list, board_database dict, winners dict)
         """
         results = []
-        winners = {
+        for result in self.iter_games(verbose, workers, seed, chunk_size, engine, sinks,
+                                      checkpoint, resume, compact_every):
+            if keep_results:
+                results.append(result)
+
+        return results, self.board_database, dict(self.winners)
+
+    def iter_games(self, verbose=False, workers=1, seed=None, chunk_size=500, engine='game', sinks=(),
+                   checkpoint=None, resume=False, compact_every=20):
+        """
+        Play the games and yield every result as soon as its chunk is done
+
+        Games are played in chunks of chunk_size. Every chunk builds a local shard of
+        exact score sums and counts (a ScoreAccumulator) which is merged into the database
+        in chunk order, so a run gives the same results whatever the number of workers.
+        Only a few chunks are in flight at a time, so memory does not grow with num_games.
+        The winners tally of the run is kept in self.winners.
+
+        With checkpoint, every finished chunk is appended to a delta log in
+        game_database/<checkpoint>/ together with the games played, the winners and the
+        RNG states (see checkpoint.Checkpoint). resume=True continues an interrupted run
+        from there, and yields only the games played after the last checkpoint.
+        A chunk is checkpointed after all its results went to the sinks (which are flushed)
+        and to the caller, so a run stopped in the middle of a chunk (crash, Ctrl-C, or the
+        caller leaving the loop) plays that whole chunk again on resume: the sinks and the
+        caller may see some results of that chunk twice, but never miss one.
+
+        Args:
+            verbose: Print game progress
+            workers: Number of processes, 1 plays everything in this process
+            seed: Base seed, every chunk seeds `random` and numpy from (seed, chunk index).
+                  None keeps the global RNG state (serial) or picks a random base seed (parallel)
+            chunk_size: Games per chunk
+            engine: 'game' plays every game through Game.play,
+                    'batch' uses the vectorized selfplay engine (RandomAI vs RandomAI only)
+                    'rollout' plays each game as a random board fill (RandomAI vs RandomAI only)
+            sinks: ResultSink objects (see sinks.py) that get every result, in game order
+            checkpoint: name of the checkpoint directory, None for no checkpoints
+            resume: continue from the checkpoint if there is one (otherwise start over)
+            compact_every: fold the delta log into the checkpoint's database every
+                           compact_every chunks (and at the end of the run)
+
+        Yields:
+            dict: game result, same format as Game.play plus 'game_number'
+        """
+        if engine not in ('game', 'batch', 'rollout'):
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine != 'game' and not self._random_vs_random():
+            raise ValueError(f"engine='{engine}' needs RandomAI on both sides")
+
+        start = time.perf_counter()
+        if seed is None and workers > 1:
+            seed = random.randrange(2 ** 32)
+
+        self.winners = {
             'RED': 0,
             'BLUE': 0,
             'Tie': 0
         }
+        games_played = 0
+
+        saved = None
+        if checkpoint is not None:
+            run = {
+                'board_size': self.board_size,
+                'num_games': self.num_games,
+                'chunk_size': chunk_size,
+                'engine': engine,
+                'gamma': self.gamma,
+                'seed': seed
+            }
+            saved = Checkpoint(checkpoint, self.board_size)
+            if resume and saved.exists():
+                self.scores = ScoreAccumulator()
+                self._board_database = None
+                state = saved.load(self.scores)
+                for name in ('board_size', 'num_games', 'chunk_size', 'engine', 'gamma'):
+                    if state['run'][name] != run[name]:
+                        raise ValueError(f"Checkpoint {checkpoint} was made with {name}={state['run'][name]}, "
+                                         f"not {run[name]}")
+                seed = state['run']['seed']
+                games_played = state['games']
+                self.winners = state['winners']
+            else:
+                saved.start(run)
+                if len(self.scores):
+                    # the checkpoint holds the whole database, including what was there before
+                    saved.compact(self.scores)
 
-        game = Game(self.board_size, self.players[RED], self.players[BLUE])
+        chunks = ((
+            self.board_size,
+            self.gamma,
+            first_game,
+            min(chunk_size, self.num_games - first_game),
+            self.num_games,
+            None if seed is None else _chunk_seed(seed, chunk_index),
+            verbose,
+            engine
+        ) for chunk_index, first_game in enumerate(range(0, self.num_games, chunk_size))
+            if first_game >= games_played)
 
-        for i in range(self.num_games):
-            if verbose or (i + 1) % 10_000 == 0:
-                print(f"Playing game {i + 1}/{self.num_games}...")
+        first_game = games_played
+        for chunk_index, (chunk_results, shard) in enumerate(self._chunk_outputs(chunks, workers), start=1):
+            self.merge_shard(shard)
+            for result in chunk_results:
+                self.winners[result['winner']] += 1
+            games_played += len(chunk_results)
 
-            # Play game
-            game.reset_game()
-            result = game.play(verbose=verbose and i == 1)  # print only the first game
-            result['game_number'] = i + 1
-            winners[result['winner']] += 1
+            for result in chunk_results:
+                for sink in sinks:
+                    sink.add(result)
+            if saved is not None:
+                for sink in sinks:
+                    sink.flush()
 
-            # Calculate scores for all board states in this game
-            board_scores = Tournament.calculate_board_scores(
-                result['board_states'],
-                result['winner'],
-                self.gamma
-            )
+            yield from chunk_results
 
-            # Update board database with dynamic averaging
-            self.update_board_database(board_scores)
+            # only a chunk the sinks and the caller have completely received counts as done
+            if saved is not None:
+                saved.save(shard, games_played, self.winners)
+                if compact_every and chunk_index % compact_every == 0:
+                    saved.compact(self.scores)
 
-            # Remove board_states from result to save memory (they're in the database now)
-            del result['board_states']
-            results.append(result)
+        if saved is not None:
+            saved.compact(self.scores)
 
-        return results, self.board_database, winners
+        if instrumentation.enabled:
+            instrumentation.add_time('tournament', time.perf_counter() - start)
+            instrumentation.count('tournament.games', games_played - first_game)
 
-    def update_board_database(self, board_scores):
-        for board_key, score in board_scores.items():
-            if board_key in self.board_database:
+    def _chunk_outputs(self, chunks, workers):
+        """(results, shard) of every chunk, in chunk order"""
+        if workers <= 1:
+            for chunk in chunks:
+                yield _play_chunk(*chunk, players=self.players)
+            return
 
-                # Dynamic average: new_avg = (old_avg * count + new_score) / (count + 1)
-                old_avg, count = self.board_database[board_key]
-                new_count = count + 1
-                new_avg = (old_avg * count + score) / new_count
-                self.board_database[board_key] = [new_avg, new_count]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.players[RED], self.players[BLUE])) as pool:
+            # keep every worker busy, but don't queue up results faster than they are consumed
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(_play_chunk, *chunk))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
 
-            # First time seeing this board
-            else:
-                self.board_database[board_key] = [score, 1]
\ No newline at end of file
+    def _random_vs_random(self):
+        return all(isinstance(player, RandomAI) or player is RandomAI
+                   for player in self.players.values())
+
+    def merge_shard(self, shard):
+        """
+        Merge a ScoreAccumulator or a {board_key: [score_sum, count]} shard into the database.
+        Sums and counts are added, so merging is exact.
+        """
+        self.scores.merge(shard)
+        self._board_database = None
+
+    def update_board_database(self, board_scores):
+        """Add one game's {board_key: score} (see calculate_board_scores)"""
+        self.scores.add(list(board_scores), list(board_scores.values()))
+        self._board_database = None
@@ -0,0 +1,149 @@
+import numpy as np
+
+from gamerecord import replay_keys
+
+
+class ScoreAccumulator:
+    """
+    Board database kept as exact per-position score sums and counts.
+
+    Every key gets a dense row id on first sight; the sums and counts live in
+    numpy arrays indexed by row. Updates are applied in bulk: the (key, score)
+    pairs of a batch are turned into row ids, identical rows are grouped with
+    np.unique and each group is added with one bincount, so the per-position
+    Python work is a single dict lookup. Sums are never averaged until the
+    database is read, so merging accumulators (shards of a parallel run, or
+    several runs) is exact.
+
+    Games added with add_game are buffered and applied batch_size positions at a time.
+    """
+
+    def __init__(self, batch_size=65536):
+        self.batch_size = batch_size
+        self._rows = {}  # key -> row
+        self._keys = []  # row -> key
+        self._sums = np.zeros(1024, dtype=np.float64)
+        self._counts = np.zeros(1024, dtype=np.int64)
+        self._pending_keys = []
+        self._pending_scores = []
+
+    def __len__(self):
+        self.flush()
+        return len(self._keys)
+
+    def __contains__(self, key):
+        self.flush()
+        return key in self._rows
+
+    def get(self, key, default=None):
+        """[average score, count] of key, like a board database entry"""
+        self.flush()
+        row = self._rows.get(key)
+        if row is None:
+            return default
+        count = int(self._counts[row])
+        return [float(self._sums[row]) / count, count]
+
+    def _row_ids(self, keys):
+        """row of every key, new keys get new rows"""
+        rows = self._rows
+        new_keys = self._keys
+        ids = []
+        for key in keys:
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = len(new_keys)
+                new_keys.append(key)
+            ids.append(row)
+
+        if len(new_keys) > len(self._sums):
+            capacity = max(len(new_keys), 2 * len(self._sums))
+            self._sums = np.concatenate([self._sums, np.zeros(capacity - len(self._sums))])
+            self._counts = np.concatenate([self._counts, np.zeros(capacity - len(self._counts), dtype=np.int64)])
+
+        return np.array(ids, dtype=np.intp)
+
+    def add(self, keys, scores, counts=None):
+        """
+        Add a batch of (key, score) observations, keys may repeat
+        :param keys: sequence of int keys
+        :param scores: score of every key (or score sums when counts is given)
+        :param counts: number of observations behind every score sum (default: 1 each)
+        """
+        if not len(keys):
+            return
+        ids = self._row_ids(keys)
+        rows, groups = np.unique(ids, return_inverse=True)
+        self._sums[rows] += np.bincount(groups, weights=np.asarray(scores, dtype=np.float64))
+        if counts is None:
+            self._counts[rows] += np.bincount(groups)
+        else:
+            self._counts[rows] += np.bincount(groups, weights=counts).astype(np.int64)
+
+    def add_game(self, moves, winner, board_size, gamma=0.9):
+        """
+        Buffer the scores of every position of a game (see Tournament.calculate_move_scores)
+        :param moves: move array of the game (see gamerecord)
+        :param winner: 'RED', 'BLUE' or 'TIE'
+        """
+        N = len(moves)
+        self._pending_keys.extend(replay_keys(moves, board_size))
+        if winner == 'RED':
+            self._pending_scores.extend([0.0] * N)
+        else:
+            outcome = 0.1 if winner == 'TIE' else 1.0
+            self._pending_scores.extend([outcome * (gamma ** (N - i - 1)) for i in range(N)])
+
+        if len(self._pending_keys) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """apply the buffered games"""
+        if self._pending_keys:
+            keys, scores = self._pending_keys, self._pending_scores
+            self._pending_keys, self._pending_scores = [], []
+            self.add(keys, scores)
+
+    def merge(self, other):
+        """
+        Add another accumulator, or a {board_key: [score_sum, count]} shard, to this one
+        """
+        if isinstance(other, ScoreAccumulator):
+            self.merge_arrays(*other.arrays())
+        else:
+            keys = list(other)
+            self.merge_arrays(keys, [other[key][0] for key in keys], [other[key][1] for key in keys])
+
+    def merge_arrays(self, keys, sums, counts):
+        """
+        Add score sums and counts of unique keys (the output of arrays())
+        """
+        if len(keys):
+            # the keys are unique, no grouping needed
+            ids = self._row_ids(keys)
+            self._sums[ids] += sums
+            self._counts[ids] += counts
+
+    def arrays(self):
+        """(keys list, score sums, counts) of all positions, in row order"""
+        self.flush()
+        n = len(self._keys)
+        return self._keys, self._sums[:n], self._counts[:n]
+
+    def to_database(self):
+        """{board_key: [average score, count]}, the format of DatabaseHandler.save_board_database"""
+        keys, sums, counts = self.arrays()
+        averages = (sums / np.maximum(counts, 1)).tolist()
+        return {key: [average, count] for key, average, count in zip(keys, averages, counts.tolist())}
+
+    def __getstate__(self):
+        # ship only the used part of the arrays to/from worker processes
+        keys, sums, counts = self.arrays()
+        return {'batch_size': self.batch_size, 'keys': keys, 'sums': sums.copy(), 'counts': counts.copy()}
+
+    def __setstate__(self, state):
+        self.__init__(state['batch_size'])
+        self._keys = state['keys']
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        self._sums = state['sums']
+        self._counts = state['counts']
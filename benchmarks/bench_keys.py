@@ -0,0 +1,70 @@
+"""
+Compare the legacy str(list) position keys with the packed int keys.
+
+Run from the repository root:
+    python -m benchmarks.bench_keys --games 2000 --size 7
+"""
+import argparse
+import random
+import sys
+import timeit
+import tracemalloc
+
+from board import grid_to_key
+from game import Game
+from gamerecord import replay_positions
+from player import RandomAI
+
+
+def legacy_key(grid):
+    return str(grid.flatten().tolist())
+
+
+def collect_states(num_games, size):
+    states = []
+    game = Game(size, RandomAI(), RandomAI())
+    for _ in range(num_games):
+        game.reset_game()
+        states.extend(grid.copy() for grid, _ in replay_positions(game.play()['moves'], size))
+    return states
+
+
+def build_database(states, key_func):
+    tracemalloc.start()
+    database = {}
+    for state in states:
+        database[key_func(state)] = [0.5, 1]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return database, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    states = collect_states(args.games, args.size)
+    sample = states[:1000]
+    print(f"{len(states)} board states from {args.games} games on {args.size}x{args.size}")
+
+    for name, key_func in (("str(list)", legacy_key), ("packed int", grid_to_key)):
+        database, peak = build_database(states, key_func)
+        keys = [key_func(s) for s in sample]
+
+        build = timeit.timeit(lambda: [key_func(s) for s in sample], number=5) / (5 * len(sample))
+        lookup = timeit.timeit(lambda: [k in database for k in keys], number=50) / (50 * len(keys))
+        # what GreedyAI actually pays: build a fresh key, then look it up
+        probe = timeit.timeit(lambda: [key_func(s) in database for s in sample], number=5) / (5 * len(sample))
+        key_bytes = sum(sys.getsizeof(k) for k in keys) / len(keys)
+
+        print(f"{name:>10}: {len(database)} keys, peak {peak / 2 ** 20:.1f} MiB, "
+              f"{key_bytes:.0f} B/key, build {build * 1e6:.2f} us/key, lookup {lookup * 1e9:.0f} ns/key, "
+              f"build+lookup {probe * 1e6:.2f} us/key")
+
+
+if __name__ == "__main__":
+    main()
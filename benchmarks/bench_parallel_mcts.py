@@ -0,0 +1,60 @@
+"""
+Strength of ParallelMCTSPlayer at a fixed wall-clock budget per move, against a
+single-process MCTSPlayer with the same budget, for an increasing number of workers.
+
+Run from the repository root:
+    python -m benchmarks.bench_parallel_mcts --workers 1 2 4 8 --games 20 --budget 0.5
+"""
+import argparse
+import json
+import random
+
+from board import RED, BLUE
+from game import Game
+from mcts import MCTSPlayer, ParallelMCTSPlayer
+
+
+def play_match(workers, mode, games, budget, size):
+    parallel_wins = 0
+    playouts_per_second = []
+
+    for i in range(games):
+        # alternate colours so the first-move advantage cancels out
+        parallel_color = RED if i % 2 == 0 else BLUE
+        baseline_color = BLUE if parallel_color == RED else RED
+
+        with ParallelMCTSPlayer(parallel_color, workers=workers, time_budget=budget, mode=mode) as parallel:
+            baseline = MCTSPlayer(baseline_color, time_budget=budget)
+            players = {parallel_color: parallel, baseline_color: baseline}
+            result = Game(size, players[RED], players[BLUE]).play()
+
+        if result['winner'] == ('RED' if parallel_color == RED else 'BLUE'):
+            parallel_wins += 1
+        playouts_per_second.append(parallel.last_stats.get('playouts_per_second', 0.0))
+
+    return {
+        'workers': workers,
+        'mode': mode,
+        'games': games,
+        'win_rate_vs_single': parallel_wins / games,
+        'playouts_per_second': sum(playouts_per_second) / len(playouts_per_second)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--mode", choices=["root", "leaf"], default="root")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds per move")
+    parser.add_argument("--size", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rows = [play_match(w, args.mode, args.games, args.budget, args.size) for w in args.workers]
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
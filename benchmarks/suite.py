@@ -0,0 +1,201 @@
+"""
+Reproducible performance benchmarks for the board engine, the players and Tournament.
+
+Run from the repository root:
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --sizes 5 7 --compare bench.json --threshold 0.15
+
+Every benchmark runs on fixed-seed positions for each board size. Results are written
+as JSON; with --compare the run is checked against a stored result file and every
+benchmark that got worse by more than --threshold is reported (exit code 1).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import contextmanager, redirect_stdout
+
+import numpy as np
+
+from board import Board, RED, BLUE
+from DatabaseHandler import DatabaseHandler
+import inferior
+from player import RandomAI, GreedyAI, HeuristicAI
+from Tournament import Tournament
+
+DEFAULT_SIZES = [5, 7, 9, 11, 13, 15, 17, 19]
+
+
+def random_position(size, fill, seed):
+    """board with round(fill * size^2) random alternating moves and no winner yet"""
+    rng = random.Random(seed)
+    while True:
+        board = Board(size)
+        cells = [(r, c) for r in range(size) for c in range(size)]
+        rng.shuffle(cells)
+        for i, (r, c) in enumerate(cells[:round(fill * size * size)]):
+            board.place(r, c, RED if i % 2 == 0 else BLUE)
+        if not board.red_wins() and not board.blue_wins():
+            return board
+        seed += 1
+
+
+def time_call(func, min_time):
+    """best seconds per call over 3 repeats, each repeat running for at least min_time"""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    return min([elapsed] + timeit.repeat(func, number=number, repeat=2)) / number
+
+
+@contextmanager
+def scratch_directory():
+    """DatabaseHandler works on ./game_database, so run in a throwaway directory"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+
+
+def bench_size(size, seed, min_time, games):
+    results = []
+
+    def record(name, value, unit, better):
+        results.append({'name': name, 'size': size, 'value': value, 'unit': unit, 'better': better})
+
+    board = random_position(size, 0.5, seed)
+
+    record('board.red_wins', time_call(board.red_wins, min_time), 's/call', 'lower')
+    record('board.blue_wins', time_call(board.blue_wins, min_time), 's/call', 'lower')
+    record('board._bfs_edge', time_call(lambda: board._bfs_edge(0, BLUE), min_time), 's/call', 'lower')
+    record('board.empty_cells', time_call(board.empty_cells, min_time), 's/call', 'lower')
+
+    def candidate_cells():
+        # measure the uncached path
+        inferior.clear_cache()
+        board.candidate_cells(BLUE)
+
+    record('board.candidate_cells', time_call(candidate_cells, min_time), 's/call', 'lower')
+
+    # players need a database: a fixed-seed random-rollout database of this size
+    random.seed(seed)
+    tournament = Tournament(games, board_size=size)
+    _, board_database, _ = tournament.run_multiple_games(seed=seed, engine='rollout')
+    database_file = f"bench_{size}.json"
+    DatabaseHandler.save_board_database(board_database, filename=database_file)
+
+    greedy = GreedyAI(database_file, BLUE, gama=1.0)
+    record('GreedyAI.get_move', time_call(lambda: greedy.get_move(board), min_time), 's/call', 'lower')
+
+    heuristic = HeuristicAI(database_file, BLUE)
+
+    def heuristic_move():
+        # measure the uncached path
+        HeuristicAI.distance_cache.clear()
+        heuristic.get_move(board)
+
+    random.seed(seed)
+    record('HeuristicAI.get_move', time_call(heuristic_move, min_time), 's/call', 'lower')
+
+    for engine in ('game', 'rollout', 'batch'):
+        tournament = Tournament(games, board_size=size, red_player_class=RandomAI(),
+                                blue_player_class=RandomAI())
+        start = time.perf_counter()
+        tournament.run_multiple_games(seed=seed, engine=engine)
+        elapsed = time.perf_counter() - start
+        record(f'Tournament.run_multiple_games[{engine}]', games / elapsed, 'games/s', 'higher')
+
+    DatabaseHandler.close_databases()
+    return results
+
+
+def run_suite(sizes, seed, min_time, games):
+    results = []
+    # DatabaseHandler prints progress, keep stdout for the JSON
+    with scratch_directory(), redirect_stdout(sys.stderr):
+        for size in sizes:
+            print(f"Benchmarking size {size}...", file=sys.stderr)
+            results.extend(bench_size(size, seed, min_time, games))
+
+    return {
+        'meta': {
+            'seed': seed,
+            'sizes': sizes,
+            'min_time': min_time,
+            'games': games,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    :return: list of regressions, benchmarks that got worse than the baseline by more than threshold
+    """
+    stored = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        base = stored.get((result['name'], result['size']))
+        if base is None or base['value'] <= 0 or result['value'] <= 0:
+            continue
+
+        if result['better'] == 'lower':
+            change = result['value'] / base['value'] - 1
+        else:
+            change = base['value'] / result['value'] - 1
+
+        if change > threshold:
+            regressions.append({'name': result['name'], 'size': result['size'],
+                                'baseline': base['value'], 'current': result['value'],
+                                'unit': result['unit'], 'slowdown': change})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing repeat")
+    parser.add_argument("--games", type=int, default=200, help="games per Tournament benchmark")
+    parser.add_argument("--out", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    args = parser.parse_args()
+
+    current = run_suite(args.sizes, args.seed, args.min_time, args.games)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['name']} size {r['size']}: {r['baseline']:.3g} -> {r['current']:.3g} "
+                  f"{r['unit']} ({r['slowdown']:+.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import random
+
+import numpy as np
+
+from board import EMPTY, RED, BLUE, grid_to_key, canonical_key, child_keys, _zobrist_rows
+from inferior import candidate_mask
+from distance import DistanceField
+
+
+class BitBoard:
+    """
+    Compact Hex board engine with the same API as board.Board.
+
+    Each colour is stored as a Python int used as a bitboard. Cell (r, c) is bit
+    r * (size + 1) + c; the extra column per row is always zero and stops the
+    shifts below from wrapping from one row into the next.
+    Neighbour expansion, flood fill and edge-to-edge distances are all done with
+    shifts and masks over whole sets of cells instead of per-cell Python loops.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.red = 0
+        self.blue = 0
+        self.hash = 0  # Zobrist hash, same numbers as board.Board
+        self._moves = []
+
+        W = size + 1
+        self._width = W
+
+        row = (1 << size) - 1
+        self._valid = sum(row << (r * W) for r in range(size))
+        self._top = row
+        self._bottom = row << ((size - 1) * W)
+        self._left = sum(1 << (r * W) for r in range(size))
+        self._right = self._left << (size - 1)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Build a bitboard from a grid array
+        :param grid: 2D array of EMPTY/RED/BLUE
+        :return: BitBoard
+        """
+        board = cls(len(grid))
+        for r, c in zip(*np.nonzero(grid)):
+            board.place(int(r), int(c), int(grid[r, c]))
+        return board
+
+    def copy(self):
+        other = BitBoard.__new__(BitBoard)
+        other.__dict__.update(self.__dict__)
+        other._moves = self._moves.copy()
+        return other
+
+    # ---------- Bit helpers ----------
+    def _bit(self, r, c):
+        return 1 << (r * self._width + c)
+
+    def _grow(self, cells):
+        """cells plus all their hex neighbours"""
+        W = self._width
+        grown = (cells | cells << 1 | cells >> 1 |
+                 cells << W | cells >> W |
+                 cells << (W - 1) | cells >> (W - 1))
+        return grown & self._valid
+
+    def _fill(self, seeds, allowed):
+        """flood fill from seeds through the cells in allowed"""
+        reached = seeds & allowed
+        while True:
+            expanded = (self._grow(reached) & allowed) | reached
+            if expanded == reached:
+                return reached
+            reached = expanded
+
+    def _cells(self, bits):
+        """generator of (r, c) for every set bit"""
+        W = self._width
+        while bits:
+            low = bits & -bits
+            yield divmod(low.bit_length() - 1, W)
+            bits ^= low
+
+    @property
+    def empty(self):
+        return self._valid & ~(self.red | self.blue)
+
+    # ---------- Board API ----------
+    def in_bounds(self, r, c):
+        return 0 <= r < self.size and 0 <= c < self.size
+
+    def neighbors(self, r, c):
+        bit = self._bit(r, c)
+        return self._cells(self._grow(bit) & ~bit)
+
+    def place(self, r, c, player):
+        """
+        this is a function that places a cell on a board
+        :param r: row
+        :param c: collum
+        :param player: turn of the game
+        :return:
+        """
+        bit = self._bit(r, c)
+        if (self.red | self.blue) & bit:
+            raise ValueError("Cell already occupied")
+
+        if player == RED:
+            self.red |= bit
+        else:
+            self.blue |= bit
+        self.hash ^= _zobrist_rows(self.size)[r * self.size + c][player]
+        self._moves.append((r, c))
+
+    def undo(self):
+        """
+        Take back the last placed stone
+        :return: (r, c) of the removed stone
+        """
+        if not self._moves:
+            raise ValueError("No move to undo")
+
+        r, c = self._moves.pop()
+        bit = self._bit(r, c)
+        player = RED if self.red & bit else BLUE
+        self.hash ^= _zobrist_rows(self.size)[r * self.size + c][player]
+        self.red &= ~bit
+        self.blue &= ~bit
+        return r, c
+
+    def is_full(self):
+        return self.empty == 0
+
+    def empty_cells(self):
+        return list(self._cells(self.empty))
+
+    @property
+    def grid(self):
+        """numpy grid of EMPTY/RED/BLUE, built on demand for the UI"""
+        grid = np.zeros((self.size, self.size), dtype=np.int8)
+        for r, c in self._cells(self.red):
+            grid[r, c] = RED
+        for r, c in self._cells(self.blue):
+            grid[r, c] = BLUE
+        return grid
+
+    def key(self):
+        return grid_to_key(self.grid)
+
+    def canonical_key(self):
+        return canonical_key(self.grid)
+
+    def child_keys(self, player, canonical=False):
+        return child_keys(self.grid, player, canonical)
+
+    def candidate_mask(self, color):
+        return candidate_mask(self.grid, color)
+
+    def candidate_cells(self, color):
+        return [(int(r), int(c)) for r, c in zip(*np.nonzero(self.candidate_mask(color)))]
+
+    def __str__(self):
+        symbols = {EMPTY: ".", RED: "R", BLUE: "B"}
+        grid = self.grid
+        lines = []
+        for r in range(self.size):
+            indent = " " * r
+            row = " ".join(symbols[grid[r, c]] for c in range(self.size))
+            lines.append(indent + row)
+        return "\n".join(lines)
+
+    def red_wins(self):
+        return self._fill(self._top, self.red) & self._bottom != 0
+
+    def blue_wins(self):
+        return self._fill(self._left, self.blue) & self._right != 0
+
+    # ---------- Distances ----------
+    def distance_field(self, color):
+        """Same contract as Board.distance_field (the field only reads size and grid)"""
+        return DistanceField(self, color)
+
+    def blue_distances(self):
+        """
+        Returns:
+            (min_total, left_map, right_map)
+
+        Same contract as Board.blue_distances
+        """
+        return self._distances(self.blue, self._left, self._right)
+
+    def red_distances(self):
+        """
+        Returns:
+            (min_total, top_map, bottom_map)
+
+        Same contract as Board.red_distances
+        """
+        return self._distances(self.red, self._top, self._bottom)
+
+    def _distances(self, own, start_edge, end_edge):
+        start_layers = self._edge_layers(own, start_edge)
+        end_layers = self._edge_layers(own, end_edge)
+
+        # a path through an empty cell counts that cell on both sides
+        min_total = None
+        for ld, left in enumerate(start_layers):
+            for rd, right in enumerate(end_layers):
+                both = left & right
+                if not both:
+                    continue
+                total = ld + rd - 1 if both & ~own else ld + rd
+                if min_total is None or total < min_total:
+                    min_total = total
+
+        return min_total, self._layers_to_map(start_layers), self._layers_to_map(end_layers)
+
+    def _edge_layers(self, own, edge):
+        """
+        0-1 BFS from an edge done one distance layer at a time.
+        layers[d] is the bitboard of cells whose distance from the edge is d,
+        where a cell of the own colour costs 0 and an empty cell costs 1.
+        """
+        empty = self.empty
+        layer = self._fill(edge & own, own)
+        reached = layer
+        layers = [layer]
+
+        while True:
+            frontier = (self._grow(reached) | edge) & empty & ~reached
+            if not frontier:
+                break
+            layer = self._fill(frontier, frontier | (own & ~reached))
+            reached |= layer
+            layers.append(layer)
+
+        return layers
+
+    def _layers_to_map(self, layers):
+        dist_map = {}
+        for d, layer in enumerate(layers):
+            for cell in self._cells(layer):
+                dist_map[cell] = d
+        return dist_map
+
+    # ---------- Random rollouts ----------
+    def _fill_randomly(self, to_move, rng):
+        """
+        Shuffle the empty cells; to_move gets the even positions, the opponent the odd ones.
+        Returns (cells, full red bitboard, full blue bitboard).
+        """
+        cells = [r * self._width + c for r, c in self._cells(self.empty)]
+        rng.shuffle(cells)
+
+        first = sum(1 << i for i in cells[0::2])
+        second = sum(1 << i for i in cells[1::2])
+        if to_move == RED:
+            return cells, self.red | first, self.blue | second
+        return cells, self.red | second, self.blue | first
+
+    def rollout(self, to_move, rng=random):
+        """
+        Winner of a uniformly random continuation from this position.
+        Random play is the same as filling the empty cells in a random order, and a
+        full Hex board always has exactly one winner, so one connectivity check is enough.
+
+        :param to_move: colour of the next player
+        :param rng: object with a shuffle() method (the random module by default)
+        :return: RED or BLUE
+        """
+        _, red, _ = self._fill_randomly(to_move, rng)
+        return RED if self._fill(self._top, red) & self._bottom else BLUE
+
+    def rollout_game(self, to_move, rng=random):
+        """
+        Like rollout(), but also find the move that actually ended the game.
+        Being connected only becomes true once and then stays true as stones are
+        added, so the end is found by binary search over the winner's stones on
+        prefixes of the random order.
+
+        :param to_move: colour of the next player
+        :param rng: object with a shuffle() method (the random module by default)
+        :return: (winner, moves) with moves the list of (r, c) up to and including the winning move
+        """
+        cells, red, _ = self._fill_randomly(to_move, rng)
+        if self._fill(self._top, red) & self._bottom:
+            winner, own, start_edge, end_edge = RED, self.red, self._top, self._bottom
+        else:
+            winner, own, start_edge, end_edge = BLUE, self.blue, self._left, self._right
+
+        # prefix[k] = winner's stones after the first k moves of the rollout
+        first = 0 if winner == to_move else 1
+        prefix = [own]
+        for k, cell in enumerate(cells):
+            prefix.append(prefix[-1] | (1 << cell) if k % 2 == first else prefix[-1])
+
+        lo, hi = 1, len(cells)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._fill(start_edge, prefix[mid]) & end_edge:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        return winner, [divmod(cell, self._width) for cell in cells[:lo]]
@@ -1,14 +1,249 @@
 import numpy as np
 from collections import deque
+from functools import lru_cache
+
+import instrumentation
 
 EMPTY = 0
 RED   = 1
 BLUE  = 2
 
+DIRECTIONS = (
+    (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0)
+)
+
+
+@lru_cache(maxsize=None)
+def flat_neighbors(size):
+    """
+    Precomputed neighbour table for a board of the given size.
+    Cells are indexed as r * size + c.
+
+    Returns:
+        tuple: neighbours[i] is a tuple of the flat indices adjacent to cell i
+    """
+    table = []
+    for r in range(size):
+        for c in range(size):
+            table.append(tuple((r + dr) * size + (c + dc) for dr, dc in DIRECTIONS
+                               if 0 <= r + dr < size and 0 <= c + dc < size))
+    return tuple(table)
+
+
+ZOBRIST_SEED = 0x5EED
+
+
+@lru_cache(maxsize=None)
+def zobrist_table(size):
+    """
+    Zobrist numbers of a board size: table[i, color] is a random 64-bit number for
+    a stone of color on cell i (column EMPTY is 0). Fixed seed, so every process
+    and every run hashes positions the same way.
+
+    :return: np.uint64 array of shape (size * size, 3)
+    """
+    rng = np.random.default_rng(ZOBRIST_SEED + size)
+    table = np.zeros((size * size, 3), dtype=np.uint64)
+    table[:, RED] = rng.integers(0, 2 ** 64, size=size * size, dtype=np.uint64)
+    table[:, BLUE] = rng.integers(0, 2 ** 64, size=size * size, dtype=np.uint64)
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=None)
+def _zobrist_rows(size):
+    """zobrist_table as Python ints, for the per-move XOR in place()/undo()"""
+    return tuple(tuple(row) for row in zobrist_table(size).tolist())
+
+
+def zobrist_hash(grid):
+    """
+    Zobrist hash of a grid computed from scratch (Board.hash keeps it incrementally)
+    :param grid: 2D array of EMPTY/RED/BLUE
+    :return: int in [0, 2**64)
+    """
+    grid = np.asarray(grid)
+    table = zobrist_table(len(grid))
+    values = table[np.arange(grid.size), grid.ravel()]
+    return int(np.bitwise_xor.reduce(values)) if values.size else 0
+
+
+@lru_cache(maxsize=None)
+def _key_packing_steps(num_bytes):
+    """
+    Shift/mask steps that squeeze one cell per byte into 2 bits per cell.
+    Each step merges neighbouring lanes pairwise, doubling both the lane width
+    and the payload kept in it, until a single lane covers the whole key.
+    """
+    total_bits = 8 * num_bytes
+    steps = []
+    shift, lane, kept = 6, 16, 4
+    while True:
+        lane_mask = (1 << kept) - 1
+        mask = 0
+        for start in range(0, total_bits, lane):
+            mask |= lane_mask << start
+        steps.append((shift, mask))
+        if lane >= total_bits:
+            return tuple(steps)
+        shift = lane - kept
+        lane, kept = 2 * lane, 2 * kept
+
+
+def grid_to_key(grid):
+    """
+    Pack a board grid into a compact integer key.
+    Every cell takes 2 bits (EMPTY=0, RED=1, BLUE=2) and cell i = r * size + c
+    sits at bits 2i..2i+1, so a 7x7 board fits in 13 bytes.
+
+    :param grid: 2D array of EMPTY/RED/BLUE
+    :return: int key
+    """
+    raw = np.asarray(grid, dtype=np.int8).tobytes()
+    key = int.from_bytes(raw, 'little')
+    for shift, mask in _key_packing_steps(len(raw)):
+        key = (key | (key >> shift)) & mask
+    return key
+
+
+def grids_to_keys(grids):
+    """
+    Vectorized grid_to_key for a stack of grids
+    :param grids: array of shape (K, size, size)
+    :return: list of K int keys
+    """
+    flat = np.asarray(grids, dtype=np.uint8).reshape(len(grids), -1)
+    bits = np.empty((flat.shape[0], 2 * flat.shape[1]), dtype=np.uint8)
+    bits[:, 0::2] = flat & 1
+    bits[:, 1::2] = flat >> 1
+    packed = np.packbits(bits, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
+def key_to_grid(key, size):
+    """
+    Inverse of grid_to_key
+    :param key: int key
+    :param size: board size
+    :return: np.int8 grid of shape (size, size)
+    """
+    n2 = size * size
+    packed = np.frombuffer(int(key).to_bytes((2 * n2 + 7) // 8, 'little'), dtype=np.uint8)
+    bits = np.unpackbits(packed, bitorder='little')[:2 * n2]
+    flat = bits[0::2] | (bits[1::2] << 1)
+    return flat.astype(np.int8).reshape(size, size)
+
+
+def canonical_key(grid):
+    """
+    Key of the position's symmetry class: the smaller key of the grid and its 180 degree rotation.
+    Rotating by 180 degrees maps every edge onto the opposite edge of the same colour
+    and keeps the colours and the side to move, so both positions have the same score.
+
+    (Transposing and swapping colours also maps a Hex position onto an equivalent one,
+    but only with the side to move swapped too. RED always moves first here, so the
+    swapped image of a reachable position is never reachable: it would never merge
+    two stored positions, and it is not used.)
+
+    :param grid: 2D array of EMPTY/RED/BLUE
+    :return: int key
+    """
+    grid = np.asarray(grid)
+    return min(grid_to_key(grid), grid_to_key(grid[::-1, ::-1]))
+
+
+def child_keys(grid, player, canonical=False):
+    """
+    See Board.child_keys
+    :param grid: 2D array of EMPTY/RED/BLUE
+    :param player: colour to place
+    :param canonical: return canonical_key of every child
+    :return: (cells, keys)
+    """
+    grid = np.asarray(grid)
+    parent = grid_to_key(grid)
+    cells = np.flatnonzero(grid.ravel() == EMPTY).tolist()
+    if not canonical:
+        return cells, [parent + (player << (2 * i)) for i in cells]
+
+    # the rotated key changes by the same delta, at the mirrored cell
+    rotated = grid_to_key(grid[::-1, ::-1])
+    last = grid.size - 1
+    return cells, [min(parent + (player << (2 * i)), rotated + (player << (2 * (last - i))))
+                   for i in cells]
+
+
+def legacy_key_to_key(legacy_key):
+    """
+    Convert an old str(list) key like "[0, 1, 2, ...]" to the packed int key
+    :param legacy_key: str key
+    :return: int key
+    """
+    cells = np.array(legacy_key.strip("[]").split(","), dtype=np.uint8)
+    return grid_to_key(cells)
+
+
 class Board:
+    """
+    Hex board.
+
+    Besides the grid, the board keeps a disjoint-set (union-find) structure over
+    the cells plus four virtual edge nodes (TOP, BOTTOM, LEFT, RIGHT).
+    place() merges a new stone with its same-coloured neighbours and edges, so
+    red_wins()/blue_wins() are a pair of find() calls instead of a BFS.
+    Every write to the structure is recorded on a trail so undo() can restore it.
+
+    hash is the 64-bit Zobrist hash of the position, updated by place()/undo() in O(1).
+
+    The grid must only be changed through place()/undo() (or built with from_grid),
+    otherwise the union-find structure goes out of sync.
+    """
+
     def __init__(self, size: int):
         self.size = size
         self.grid = np.zeros((size, size), dtype=np.int8)
+        self.hash = 0
+
+        # virtual edge nodes
+        n2 = size * size
+        self._top, self._bottom = n2, n2 + 1
+        self._left, self._right = n2 + 2, n2 + 3
+
+        self._parent = list(range(n2 + 4))
+        self._rank = [0] * (n2 + 4)
+        self._trail = []  # (index, old_parent, old_rank)
+        self._moves = []  # (r, c, trail length before the move)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Build a board (including the union-find structure) from a grid array
+        :param grid: 2D array of EMPTY/RED/BLUE
+        :return: Board
+        """
+        board = cls(len(grid))
+        for r, c in zip(*np.nonzero(grid)):
+            board.place(int(r), int(c), int(grid[r, c]))
+        return board
+
+    def copy(self):
+        """
+        Return an independent copy of the board, including the union-find
+        structure and the undo history
+        """
+        other = Board.__new__(Board)
+        other.size = self.size
+        other.grid = self.grid.copy()
+        other.hash = self.hash
+        other._top, other._bottom = self._top, self._bottom
+        other._left, other._right = self._left, self._right
+        other._parent = self._parent.copy()
+        other._rank = self._rank.copy()
+        other._trail = self._trail.copy()
+        other._moves = self._moves.copy()
+        return other
 
     def in_bounds(self, r, c):
         return 0 <= r < self.size and 0 <= c < self.size
@@ -20,12 +255,7 @@ class Board:
         :param c: collum
         :return:
         """
-        directions = [
-            (-1, 0), (-1, 1),
-            (0, -1), (0, 1),
-            (1, -1), (1, 0)
-        ]
-        for dr, dc in directions:
+        for dr, dc in DIRECTIONS:
             nr, nc = r + dr, c + dc
             if self.in_bounds(nr, nc):
                 yield nr, nc
@@ -41,13 +271,110 @@ class Board:
         if self.grid[r, c] != EMPTY:
             raise ValueError("Cell already occupied")
         self.grid[r, c] = player
+        self._moves.append((r, c, len(self._trail)))
+
+        n = self.size
+        i = r * n + c
+        self.hash ^= _zobrist_rows(n)[i][player]
+        for j in flat_neighbors(n)[i]:
+            if self.grid[j // n, j % n] == player:
+                self._union(i, j)
+
+        if player == RED:
+            if r == 0:
+                self._union(i, self._top)
+            if r == n - 1:
+                self._union(i, self._bottom)
+        elif player == BLUE:
+            if c == 0:
+                self._union(i, self._left)
+            if c == n - 1:
+                self._union(i, self._right)
+
+    def undo(self):
+        """
+        Take back the last placed stone, restoring the union-find structure
+        :return: (r, c) of the removed stone
+        """
+        if not self._moves:
+            raise ValueError("No move to undo")
+
+        r, c, mark = self._moves.pop()
+        trail = self._trail
+        while len(trail) > mark:
+            i, parent, rank = trail.pop()
+            self._parent[i] = parent
+            self._rank[i] = rank
+
+        self.hash ^= _zobrist_rows(self.size)[r * self.size + c][self.grid[r, c]]
+        self.grid[r, c] = EMPTY
+        return r, c
+
+    def _find(self, i):
+        """find() with path halving, every write goes on the trail"""
+        parent = self._parent
+        while parent[i] != i:
+            grandparent = parent[parent[i]]
+            if grandparent != parent[i]:
+                self._trail.append((i, parent[i], self._rank[i]))
+                parent[i] = grandparent
+            i = grandparent
+        return i
+
+    def _union(self, a, b):
+        """union by rank, every write goes on the trail"""
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+
+        rank = self._rank
+        if rank[a] < rank[b]:
+            a, b = b, a
+
+        self._trail.append((b, self._parent[b], rank[b]))
+        self._parent[b] = a
+        if rank[a] == rank[b]:
+            self._trail.append((a, self._parent[a], rank[a]))
+            rank[a] += 1
 
     def is_full(self):
         return not np.any(self.grid == EMPTY)
 
+    def key(self):
+        """Compact position key, see grid_to_key"""
+        return grid_to_key(self.grid)
+
+    def canonical_key(self):
+        """Key of the position's symmetry class, see canonical_key"""
+        return canonical_key(self.grid)
+
+    def child_keys(self, player, canonical=False):
+        """
+        Keys of every position reachable by one move of player, without building boards.
+        Placing player on cell i only adds player << 2i to the packed key.
+
+        :param player: colour to place
+        :param canonical: return the canonical (symmetry class) keys
+        :return: (cells, keys) with cells the flat indices (r * size + c) of the empty cells
+        """
+        return child_keys(self.grid, player, canonical)
+
     def empty_cells(self):
         return list(zip(*np.where(self.grid == EMPTY)))
 
+    def candidate_mask(self, color):
+        """
+        Boolean grid of the empty cells worth a move of color: dead cells and cells
+        captured by the opponent are left out (see inferior.candidate_mask)
+        """
+        # imported here, inferior.py imports this module
+        from inferior import candidate_mask
+        return candidate_mask(self.grid, color)
+
+    def candidate_cells(self, color):
+        """empty_cells() without the provably inferior moves of color, see candidate_mask"""
+        return list(zip(*np.nonzero(self.candidate_mask(color))))
+
     def __str__(self):
         symbols = {EMPTY: ".", RED: "R", BLUE: "B"}
         lines = []
@@ -58,50 +385,21 @@ class Board:
         return "\n".join(lines)
 
     def red_wins(self):
-        n = self.size
-        visited = set()
-        q = deque()
-
-        # Start from top row
-        for c in range(n):
-            if self.grid[0, c] == RED:
-                q.append((0, c))
-                visited.add((0, c))
-
-        while q:
-            r, c = q.popleft()
-            if r == n - 1:
-                return True
-
-            for nr, nc in self.neighbors(r, c):
-                if (nr, nc) not in visited and self.grid[nr, nc] == RED:
-                    visited.add((nr, nc))
-                    q.append((nr, nc))
-
-        return False
+        """RED wins when the TOP and BOTTOM edges are in the same set"""
+        return self._find(self._top) == self._find(self._bottom)
 
     def blue_wins(self):
-        n = self.size
-        visited = set()
-        q = deque()
-
-        # Start from left column
-        for r in range(n):
-            if self.grid[r, 0] == BLUE:
-                q.append((r, 0))
-                visited.add((r, 0))
-
-        while q:
-            r, c = q.popleft()
-            if c == n - 1:
-                return True
-
-            for nr, nc in self.neighbors(r, c):
-                if (nr, nc) not in visited and self.grid[nr, nc] == BLUE:
-                    visited.add((nr, nc))
-                    q.append((nr, nc))
+        """BLUE wins when the LEFT and RIGHT edges are in the same set"""
+        return self._find(self._left) == self._find(self._right)
 
-        return False
+    def distance_field(self, color):
+        """
+        Edge distances of a colour as a distance.DistanceField
+        (numpy arrays via .arrays(), incremental updates via .place())
+        """
+        # imported here, distance.py imports this module
+        from distance import DistanceField
+        return DistanceField(self, color)
 
     def blue_distances(self):
         """
@@ -112,19 +410,9 @@ class Board:
         left_map: distance from LEFT edge to each cell
         right_map: distance from RIGHT edge to each cell
         """
-        left_map = self._bfs_edge(0, BLUE)
-        right_map = self._bfs_edge(self.size - 1, BLUE)
-
-        min_total = float('inf')
-        for pos, ld in left_map.items():
-            if pos in right_map:
-                rd = right_map[pos]
-                min_total = min(min_total, ld + rd)
-
-        if min_total == float('inf'):
-            min_total = None
-
-        return min_total, left_map, right_map
+        field = self.distance_field(BLUE)
+        left_map, right_map = field.maps()
+        return field.min_total, left_map, right_map
 
     def red_distances(self):
         """
@@ -135,33 +423,26 @@ class Board:
         top_map: distance from TOP edge to each cell
         bottom_map: distance from BOTTOM edge to each cell
         """
-        top_map = self._bfs_edge(0, RED, vertical=True)
-        bottom_map = self._bfs_edge(self.size - 1, RED, vertical=True)
-
-        min_total = float('inf')
-        for pos, td in top_map.items():
-            if pos in bottom_map:
-                bd = bottom_map[pos]
-                min_total = min(min_total, td + bd)
-
-        if min_total == float('inf'):
-            min_total = None
-
-        return min_total, top_map, bottom_map
+        field = self.distance_field(RED)
+        top_map, bottom_map = field.maps()
+        return field.min_total, top_map, bottom_map
 
+    @instrumentation.timed('bfs.board_edge')
     def _bfs_edge(self, edge_index, color, vertical=False):
         """
-        BFS from one edge to all reachable cells.
+        0-1 BFS from one edge to all reachable cells.
         If vertical is False -> left/right edges (Blue)
         If vertical is True  -> top/bottom edges (Red)
 
         Returns the minimum number of empty tiles that need to be filled
         to connect from a given edge to every reachable cell.
+        A cell is final only when it is popped with its best cost, so a cell
+        first reached through an empty tile can still be improved later.
 
         Returns:
             dict: {(r, c): distance}
         """
-        visited = set()
+        dist_map = {}
         q = deque()
 
         # Initialize from the given edge
@@ -170,28 +451,29 @@ class Board:
 
             if self.grid[r, c] in (color, EMPTY):
                 cost = 0 if self.grid[r, c] == color else 1
+                dist_map[(r, c)] = cost
                 q.append((r, c, cost))
-                visited.add((r, c))
-
-        dist_map = {}
 
         while q:
             r, c, cost = q.popleft()
-
-            # Store minimal distance for this cell
-            if (r, c) not in dist_map or cost < dist_map[(r, c)]:
-                dist_map[(r, c)] = cost
+            if cost > dist_map[(r, c)]:
+                continue
 
             for nr, nc in self.neighbors(r, c):
-                if (nr, nc) not in visited:
-                    cell = self.grid[nr, nc]
-
-                    if cell == color:
-                        q.appendleft((nr, nc, cost))
-                        visited.add((nr, nc))
-
-                    elif cell == EMPTY:
-                        q.append((nr, nc, cost + 1))
-                        visited.add((nr, nc))
-
-        return dist_map
\ No newline at end of file
+                cell = self.grid[nr, nc]
+
+                if cell == color:
+                    new_cost = cost
+                elif cell == EMPTY:
+                    new_cost = cost + 1
+                else:
+                    continue
+
+                if (nr, nc) not in dist_map or new_cost < dist_map[(nr, nc)]:
+                    dist_map[(nr, nc)] = new_cost
+                    if new_cost == cost:
+                        q.appendleft((nr, nc, new_cost))
+                    else:
+                        q.append((nr, nc, new_cost))
+
+        return dist_map
@@ -0,0 +1,182 @@
+import json
+import os
+import random
+from pathlib import Path
+
+import numpy as np
+
+from BinaryDatabase import key_bytes_for_size
+
+
+def _encode_keys(keys, key_bytes):
+    """int keys -> (n, key_bytes) uint8 array of fixed-width big-endian keys"""
+    raw = b"".join(key.to_bytes(key_bytes, "big") for key in keys)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(keys), key_bytes)
+
+
+def _decode_keys(packed):
+    raw = packed.tobytes()
+    key_bytes = packed.shape[1]
+    return [int.from_bytes(raw[i:i + key_bytes], "big") for i in range(0, len(raw), key_bytes)]
+
+
+def _rng_states():
+    """states of `random` and numpy's global RNG as JSON-friendly lists"""
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    version, internal, gauss = random.getstate()
+    return {
+        'random': [version, list(internal), gauss],
+        'numpy': [name, keys.tolist(), pos, has_gauss, cached_gaussian]
+    }
+
+
+def _restore_rng_states(states):
+    version, internal, gauss = states['random']
+    random.setstate((version, tuple(internal), gauss))
+    name, keys, pos, has_gauss, cached_gaussian = states['numpy']
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+
+
+def _write_atomically(path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Checkpoint:
+    """
+    Crash-safe progress of a Tournament run, kept in game_database/<name>/
+
+        checkpoint.json  run parameters, games played, winners, RNG states, the
+                         current delta log generation and how many bytes of it are valid
+        scores.npz       compacted database: keys, exact score sums and counts, and the
+                         number of delta log generations folded into it
+        deltas.<g>.log   append-only log, one (keys, sums, counts) record per finished chunk
+
+    A chunk's record is appended and synced before checkpoint.json is (atomically)
+    replaced, so after a crash the log may end with a record the checkpoint does not
+    cover; it is cut off on resume and that chunk is played again.
+    compact() folds the current log into scores.npz and starts the next generation,
+    so every step of it can be interrupted without counting a record twice.
+    """
+
+    def __init__(self, name, board_size):
+        self.directory = Path("game_database") / name
+        self.key_bytes = key_bytes_for_size(board_size)
+
+        self.state_path = self.directory / "checkpoint.json"
+        self.scores_path = self.directory / "scores.npz"
+        self.state = None
+
+    def _log_path(self, generation):
+        return self.directory / f"deltas.{generation}.log"
+
+    def exists(self):
+        return self.state_path.exists()
+
+    def start(self, run):
+        """
+        Start a new checkpointed run, dropping whatever an earlier run left in the directory
+        :param run: dict of the run parameters, compared on resume
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in list(self.directory.glob("deltas.*.log")) + [self.scores_path]:
+            if path.exists():
+                path.unlink()
+
+        self.state = {
+            'run': run,
+            'games': 0,
+            'winners': {'RED': 0, 'BLUE': 0, 'Tie': 0},
+            'generation': 0,
+            'log_bytes': 0
+        }
+        self._log_path(0).touch()
+        self._save_state()
+
+    def _save_state(self):
+        self.state['rng'] = _rng_states()
+        _write_atomically(self.state_path, lambda f: f.write(json.dumps(self.state).encode()))
+
+    def load(self, scores):
+        """
+        Read the checkpoint, restore the RNG states and add the saved database to scores
+
+        Args:
+            scores: ScoreAccumulator to fill
+
+        Returns:
+            dict: state with 'run', 'games' and 'winners'
+        """
+        with open(self.state_path) as f:
+            self.state = json.load(f)
+
+        folded = self._load_scores(scores)
+        if folded > self.state['generation']:
+            # compact() stopped after writing scores.npz: the current log is already in it
+            self._log_path(self.state['generation']).unlink(missing_ok=True)
+            self.state['generation'] = folded
+            self.state['log_bytes'] = 0
+            self._log_path(folded).touch()
+        else:
+            log_path = self._log_path(self.state['generation'])
+            with open(log_path, "r+b") as f:
+                # cut off a record written after the last checkpoint
+                f.truncate(self.state['log_bytes'])
+            for keys, sums, counts in self._log_records():
+                scores.merge_arrays(keys, sums, counts)
+
+        _restore_rng_states(self.state['rng'])
+        return self.state
+
+    def _load_scores(self, scores):
+        """add scores.npz to scores, returns the number of generations folded into it"""
+        if not self.scores_path.exists():
+            return 0
+        with np.load(self.scores_path) as data:
+            scores.merge_arrays(_decode_keys(data['keys']), data['sums'], data['counts'])
+            return int(data['generation'])
+
+    def _log_records(self):
+        with open(self._log_path(self.state['generation']), "rb") as f:
+            while f.tell() < self.state['log_bytes']:
+                keys = _decode_keys(np.load(f))
+                yield keys, np.load(f), np.load(f)
+
+    def save(self, shard, games, winners):
+        """
+        Record a finished chunk: append its ScoreAccumulator to the delta log, then the progress
+        :param shard: ScoreAccumulator of the chunk
+        :param games: games played so far
+        :param winners: winners tally so far
+        """
+        keys, sums, counts = shard.arrays()
+        with open(self._log_path(self.state['generation']), "ab") as f:
+            np.save(f, _encode_keys(keys, self.key_bytes))
+            np.save(f, sums)
+            np.save(f, counts)
+            f.flush()
+            os.fsync(f.fileno())
+            log_bytes = f.tell()
+
+        self.state.update(games=games, winners=dict(winners), log_bytes=log_bytes)
+        self._save_state()
+
+    def compact(self, scores):
+        """
+        Fold the delta log into scores.npz
+        :param scores: ScoreAccumulator holding the whole database of the run (what load() restores)
+        """
+        generation = self.state['generation']
+        keys, sums, counts = scores.arrays()
+        _write_atomically(self.scores_path, lambda f: np.savez(
+            f, keys=_encode_keys(keys, self.key_bytes), sums=sums, counts=counts,
+            generation=np.int64(generation + 1)))
+
+        self._log_path(generation + 1).touch()
+        self.state.update(generation=generation + 1, log_bytes=0)
+        self._save_state()
+        self._log_path(generation).unlink()
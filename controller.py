@@ -0,0 +1,259 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+
+from board import Board, RED, BLUE, EMPTY
+from player import Player, HumanPlayer
+
+
+def _name(color):
+    return 'RED' if color == RED else 'BLUE'
+
+
+class GameController(QObject):
+    """
+    Model + Controller: owns the board and the players and runs the game.
+
+    Everything slow happens off the GUI thread, on a single worker thread:
+    - players can be given as factories (anything that is not a Player instance, e.g.
+      lambda: HeuristicAI(path, BLUE)); they are built in the background, so
+      loading a database does not keep the window from showing up
+    - AI moves are computed on a copy of the board and come back through a signal
+
+    Finished jobs are collected on the GUI thread by a timer running every
+    POLL_INTERVAL_MS while jobs are pending, and reported through the job_finished /
+    job_failed signals, so worker threads never touch Qt objects and every slot runs
+    on the GUI thread.
+
+    Every job is tagged with the game generation; reset_game() starts a new
+    generation, so results of a cancelled game are dropped when they arrive.
+    With think_time, players with a time_budget attribute (MCTSPlayer) get the
+    budget passed directly; any other AI still thinking after think_time seconds is
+    cancelled the same way and a random move is played for it. The clock starts when
+    the worker picks the move up: an abandoned move keeps the worker busy until it
+    finishes, and the move queued behind it still gets its full think_time.
+    """
+
+    # (tag, result) / (tag, error message) of a background job
+    job_finished = Signal(object, object)
+    job_failed = Signal(object, str)
+
+    # job polling and thinking indicator refresh, ~60 fps
+    POLL_INTERVAL_MS = 16
+
+    def __init__(self, board_size, red_player, blue_player, think_time=None):
+        super().__init__()
+        self.board_size = board_size
+        self.think_time = think_time
+        self.ui = None
+
+        self.board = Board(board_size)
+        self.current = RED
+        self.winner = None
+        self._generation = 0
+        self._started = False
+        self._move = None  # AI move being computed: {'started': worker start time, 'deadline': bool}
+        self._jobs = []  # (tag, future) of the submitted jobs
+
+        # one worker: jobs of a cancelled game finish before new ones start,
+        # so the players' caches are never used from two threads at once
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(self.POLL_INTERVAL_MS)
+        self._poll_timer.timeout.connect(self._poll)
+        self.job_finished.connect(self._job_finished)
+        self.job_failed.connect(self._job_failed)
+
+        self.players = {}
+        self._loading = set()
+        for color, player in ((RED, red_player), (BLUE, blue_player)):
+            if isinstance(player, Player):
+                self.players[color] = player
+            else:
+                self._loading.add(color)
+                self._run(('load', color), player)
+
+        for player in self.players.values():
+            self._apply_think_time(player)
+
+    def set_ui(self, ui):
+        self.ui = ui
+        if self._loading:
+            self._set_status("Loading players...", None)
+
+    # ---------- Queries (called by the UI) ----------
+    def get_board_state(self):
+        return self.board.grid
+
+    def is_game_active(self):
+        return self._started and not self._loading and self.winner is None
+
+    def is_human_turn(self):
+        return isinstance(self.players.get(self.current), HumanPlayer)
+
+    def is_thinking(self):
+        return self._move is not None
+
+    # ---------- Game flow ----------
+    def start_game(self):
+        self._started = True
+        if not self._loading:
+            self._next_turn()
+
+    def reset_game(self):
+        """Start over; a move still being computed for the old game is dropped"""
+        self._generation += 1
+        self._stop_thinking()
+        self.board = Board(self.board_size)
+        self.current = RED
+        self.winner = None
+        self._update_display()
+        self.start_game()
+
+    def place_tile(self, r, c):
+        """Human move, ignored unless it is a human's turn on an empty cell"""
+        if not self.is_game_active() or not self.is_human_turn() or self.board.grid[r, c] != EMPTY:
+            return
+        self._play(r, c)
+
+    def _play(self, r, c):
+        self.board.place(r, c, self.current)
+        self._update_display((r, c))
+
+        if (self.current == RED and self.board.red_wins()) or \
+                (self.current == BLUE and self.board.blue_wins()):
+            self.winner = _name(self.current)
+        elif self.board.is_full():
+            self.winner = "TIE"
+
+        if self.winner is not None:
+            if self.ui is not None:
+                self.ui.handle_game_over(self.winner)
+            return
+
+        self.current = BLUE if self.current == RED else RED
+        self._next_turn()
+
+    def _next_turn(self):
+        if self.is_game_active() and not self.is_human_turn():
+            self._request_ai_move()
+
+    # ---------- AI moves ----------
+    def _request_ai_move(self):
+        player = self.players[self.current]
+        board = self.board.copy()
+        move = self._move = {
+            'started': None,
+            'deadline': self.think_time is not None and not hasattr(player, 'time_budget')
+        }
+
+        def think():
+            # the worker may have been busy with an abandoned move until now
+            move['started'] = time.perf_counter()
+            return player.get_move(board)
+
+        self._run(('move', self._generation), think)
+        self._report_progress()
+
+    def _apply_think_time(self, player):
+        if self.think_time is not None and hasattr(player, 'time_budget'):
+            player.time_budget = self.think_time
+
+    def _check_think_time(self):
+        move = self._move
+        if move is None or not move['deadline'] or move['started'] is None:
+            return
+        if time.perf_counter() - move['started'] >= self.think_time:
+            self._think_time_over()
+
+    def _think_time_over(self):
+        # drop the late result, the AI still finishes in the background
+        self._generation += 1
+        self._stop_thinking()
+        self._play(*random.choice(self.board.empty_cells()))
+
+    def _stop_thinking(self):
+        self._move = None
+        self._set_status(None, None)
+
+    def _report_progress(self):
+        move = self._move
+        if move is None:
+            return
+        if move['started'] is None:
+            self._set_status(f"{_name(self.current)} is waiting for the previous move to finish...", None)
+            return
+        elapsed = time.perf_counter() - move['started']
+        progress = None if self.think_time is None else min(elapsed / self.think_time, 1.0)
+        self._set_status(f"{_name(self.current)} is thinking... {elapsed:.1f}s", progress)
+
+    # ---------- Background jobs ----------
+    def _run(self, tag, function):
+        self._jobs.append((tag, self._executor.submit(function)))
+        self._poll_timer.start()
+
+    @Slot()
+    def _poll(self):
+        """report finished jobs, in submission order, enforce think_time and refresh the thinking indicator"""
+        while self._jobs and self._jobs[0][1].done():
+            tag, future = self._jobs.pop(0)
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is None:
+                self.job_finished.emit(tag, future.result())
+            else:
+                self.job_failed.emit(tag, f"{type(error).__name__}: {error}")
+
+        self._check_think_time()
+        self._report_progress()
+        if not self._jobs:
+            self._poll_timer.stop()
+
+    @Slot(object, object)
+    def _job_finished(self, tag, result):
+        kind, value = tag
+
+        if kind == 'load':
+            self.players[value] = result
+            self._apply_think_time(result)
+            self._loading.discard(value)
+            if not self._loading:
+                self._set_status(None, None)
+                if self._started:
+                    self._next_turn()
+            return
+
+        if value != self._generation or not self.is_thinking():
+            return  # the game was reset, or the AI ran out of time
+        self._stop_thinking()
+        self._play(*result)
+
+    @Slot(object, str)
+    def _job_failed(self, tag, message):
+        kind, value = tag
+        if kind == 'move' and value != self._generation:
+            return
+        self._stop_thinking()
+        self._started = False
+        self._set_status(f"Error: {message}", None)
+
+    def shutdown(self):
+        """Drop pending jobs and wait for the running one, call before the application exits"""
+        self._generation += 1
+        self._stop_thinking()
+        self._poll_timer.stop()
+        self._jobs = []
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    # ---------- UI notifications ----------
+    def _update_display(self, cell=None):
+        if self.ui is not None:
+            self.ui.update_display(cell)
+
+    def _set_status(self, text, progress):
+        if self.ui is not None:
+            self.ui.show_status(text, progress)
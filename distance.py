@@ -0,0 +1,205 @@
+from collections import deque, OrderedDict
+
+import numpy as np
+
+import instrumentation
+from board import EMPTY, RED, flat_neighbors
+
+# distance of cells that can't be reached (opponent stones, cut-off areas)
+UNREACHABLE = np.iinfo(np.int32).max
+
+
+class DistanceField:
+    """
+    Stone-aware edge distances for one colour.
+
+    start[i] / end[i] is the minimal number of EMPTY cells on a path from the
+    colour's first / second edge to cell i, counting cell i itself. Own stones
+    cost 0, empty cells cost 1 and opponent stones can't be crossed.
+    Both maps are computed with a 0-1 BFS: a cell is only settled when it is
+    popped with its current best distance, and stale queue entries are skipped,
+    so every distance is a shortest path distance.
+
+    place() updates the field after a single move. An own stone makes a cell
+    cheaper, and only paths through it improve, so the update is a 0-1 BFS
+    started from that cell. An opponent stone can make distances grow, so the
+    field is recomputed.
+    """
+
+    def __init__(self, board, color):
+        self.size = board.size
+        self.color = color
+        self.cells = board.grid.ravel().tolist()
+
+        n = self.size
+        if color == RED:
+            self.start_edge = list(range(n))
+            self.end_edge = list(range(n * (n - 1), n * n))
+        else:
+            self.start_edge = list(range(0, n * n, n))
+            self.end_edge = list(range(n - 1, n * n, n))
+
+        self.start = self._bfs(self.start_edge)
+        self.end = self._bfs(self.end_edge)
+
+    def copy(self):
+        other = DistanceField.__new__(DistanceField)
+        other.__dict__.update(self.__dict__)
+        other.cells = self.cells.copy()
+        other.start = self.start.copy()
+        other.end = self.end.copy()
+        return other
+
+    def _cost(self, i):
+        cell = self.cells[i]
+        if cell == self.color:
+            return 0
+        if cell == EMPTY:
+            return 1
+        return None
+
+    @instrumentation.timed('bfs.distance_field')
+    def _bfs(self, edge):
+        dist = [UNREACHABLE] * (self.size * self.size)
+        q = deque()
+        for i in edge:
+            cost = self._cost(i)
+            if cost is not None:
+                dist[i] = cost
+                if cost == 0:
+                    q.appendleft((0, i))
+                else:
+                    q.append((cost, i))
+        self._relax(dist, q)
+        return dist
+
+    def _relax(self, dist, q):
+        """0-1 BFS from the (distance, cell) entries in q"""
+        neighbors = flat_neighbors(self.size)
+        cells = self.cells
+        color = self.color
+
+        while q:
+            d, i = q.popleft()
+            if d > dist[i]:
+                # stale entry, the cell was improved after it was queued
+                continue
+
+            for j in neighbors[i]:
+                cell = cells[j]
+                if cell == color:
+                    nd = d
+                elif cell == EMPTY:
+                    nd = d + 1
+                else:
+                    continue
+
+                if nd < dist[j]:
+                    dist[j] = nd
+                    if nd == d:
+                        q.appendleft((nd, j))
+                    else:
+                        q.append((nd, j))
+
+    def place(self, r, c, player):
+        """Update the field for a stone of player placed on (r, c)"""
+        i = r * self.size + c
+        if self.cells[i] != EMPTY:
+            raise ValueError("Cell already occupied")
+        self.cells[i] = player
+
+        if player != self.color:
+            self.start = self._bfs(self.start_edge)
+            self.end = self._bfs(self.end_edge)
+            return
+
+        neighbors = flat_neighbors(self.size)
+        for dist, edge in ((self.start, self.start_edge), (self.end, self.end_edge)):
+            # the cell now costs 0: its best path enters from the edge or a neighbour
+            best = 0 if i in edge else min((dist[j] for j in neighbors[i]), default=UNREACHABLE)
+            if best < dist[i]:
+                dist[i] = best
+                self._relax(dist, deque([(best, i)]))
+
+    @property
+    def min_total(self):
+        """
+        Minimal number of EMPTY cells needed to connect the two edges, or None.
+        A path through cell i costs start[i] + end[i] minus the cost of i, which both sides count.
+        """
+        start = np.array(self.start, dtype=np.int64)
+        end = np.array(self.end, dtype=np.int64)
+        reachable = (start != UNREACHABLE) & (end != UNREACHABLE)
+        if not reachable.any():
+            return None
+
+        empty = np.array(self.cells) == EMPTY
+        total = start + end - empty
+        return int(total[reachable].min())
+
+    def arrays(self):
+        """(start, end) as (size, size) np.int32 arrays, UNREACHABLE where there is no path"""
+        n = self.size
+        return (np.array(self.start, dtype=np.int32).reshape(n, n),
+                np.array(self.end, dtype=np.int32).reshape(n, n))
+
+    def maps(self):
+        """(start, end) as {(r, c): distance} dicts of the reachable cells"""
+        n = self.size
+        return tuple({divmod(i, n): d for i, d in enumerate(dist) if d != UNREACHABLE}
+                     for dist in (self.start, self.end))
+
+
+def edge_distances(board, color):
+    """
+    Both edge distance arrays of a colour in one call
+
+    Returns:
+        (min_total, start, end) with start/end (size, size) np.int32 arrays
+    """
+    field = DistanceField(board, color)
+    return (field.min_total,) + field.arrays()
+
+
+class DistanceCache:
+    """
+    Bounded LRU cache of min_total results keyed by (board size, Zobrist hash, colour).
+    compute is only called on a miss, and the least recently used entry is evicted
+    once the cache holds maxsize results.
+    """
+
+    def __init__(self, maxsize=200_000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, size, position_hash, color, compute):
+        key = (size, position_hash, color)
+        entries = self._entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+
+        self.misses += 1
+        value = compute()
+        entries[key] = value
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._entries),
+            'maxsize': self.maxsize
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
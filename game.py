@@ -1,4 +1,8 @@
+import time
+
 from board import Board, RED, BLUE, EMPTY
+from gamerecord import move_array
+import instrumentation
 import player
 
 class Game:
@@ -12,8 +16,7 @@ class Game:
         self.current = RED
         self.winner = None
 
-        self.move_history = []
-        self.board_states = []  # Track all board states
+        self.moves = []  # flat cell r * size + c of every move
 
     def switch_player(self):
         self.current = BLUE if self.current == RED else RED
@@ -23,27 +26,27 @@ class Game:
         Play a complete game and return the result
 
         Returns:
-            dict: Game result with winner, moves, and board states
+            dict: Game result with winner and the moves as a compact array
+                  (the board states can be replayed from it, see gamerecord)
         """
         while True:
-            # Save current board state before making a move
-            self.board_states.append(self.board.grid.copy())
-
             if verbose:
-                print(f"\nMove {len(self.move_history) + 1}")
+                print(f"\nMove {len(self.moves) + 1}")
                 print(self.board)
 
             # Get current player's move
             player = self.players[self.current]
-            r, c = player.get_move(self.board)
+            if instrumentation.enabled:
+                start = time.perf_counter()
+                r, c = player.get_move(self.board)
+                instrumentation.record_latency(
+                    f"get_move.{'RED' if self.current == RED else 'BLUE'}.{type(player).__name__}",
+                    time.perf_counter() - start)
+            else:
+                r, c = player.get_move(self.board)
 
             # Record move
-            self.move_history.append({
-                'player': 'RED' if self.current == RED else 'BLUE',
-                'row': int(r),
-                'col': int(c),
-                'move_number': len(self.move_history) + 1
-            })
+            self.moves.append(int(r) * self.size + int(c))
 
             # Make move
             self.board.place(r, c, self.current)
@@ -79,9 +82,7 @@ class Game:
         self.current = RED
         self.winner = None
 
-        self.move_history = []
-        self.board_states = []  # Track all board states
-
+        self.moves = []
 
     def _create_result(self):
         """Create a game result dictionary"""
@@ -90,8 +91,8 @@ class Game:
 
         return {
             'winner': winner,
-            'total_moves': len(self.move_history),
-            'moves': self.move_history,
-            'board_states': self.board_states,
+            'board_size': self.size,
+            'total_moves': len(self.moves),
+            'moves': move_array(self.moves),
             'final_board': self.board.grid.tolist()
         }
\ No newline at end of file
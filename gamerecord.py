@@ -0,0 +1,80 @@
+import numpy as np
+
+from board import EMPTY, RED, BLUE, _zobrist_rows
+
+# a game is recorded as the flat cells r * size + c of its moves, RED first
+MOVE_DTYPE = np.int16
+
+_PLAYER_NAMES = ('RED', 'BLUE')
+
+
+def move_array(moves):
+    """compact move record of a sequence of flat cells"""
+    return np.asarray(moves, dtype=MOVE_DTYPE)
+
+
+def replay_positions(moves, size):
+    """
+    Replay a move record, yielding the position before every move.
+    A single grid is updated in place, so memory stays O(size^2) however long the game;
+    copy the grid to keep it past the next step.
+
+    Args:
+        moves: flat cells of the moves, RED first
+        size: board size
+
+    Yields:
+        (grid, hash): the shared (size, size) np.int8 grid and its Zobrist hash (see Board.hash)
+    """
+    grid = np.zeros((size, size), dtype=np.int8)
+    flat = grid.reshape(-1)
+    rows = _zobrist_rows(size)
+    position_hash = 0
+    for t, cell in enumerate(np.asarray(moves).tolist()):
+        yield grid, position_hash
+        color = RED if t % 2 == 0 else BLUE
+        flat[cell] = color
+        position_hash ^= rows[cell][color]
+
+
+def replay_keys(moves, size, canonical=True):
+    """
+    Database keys of the position before every move of a record, without building grids.
+    A move adds player << 2i to the key (see grid_to_key) and the same delta at the
+    mirrored cell to the key of the 180 degree rotation, so every key costs O(1).
+
+    Args:
+        moves: flat cells of the moves, RED first
+        size: board size
+        canonical: yield canonical_key instead of grid_to_key
+
+    Yields:
+        int: key of every position, in order
+    """
+    last = size * size - 1
+    key = rotated = 0
+    for t, cell in enumerate(np.asarray(moves).tolist()):
+        yield min(key, rotated) if canonical else key
+        color = RED if t % 2 == 0 else BLUE
+        key += color << (2 * cell)
+        rotated += color << (2 * (last - cell))
+
+
+def final_grid(moves, size):
+    """(size, size) np.int8 grid after all the moves of a record"""
+    flat = np.full(size * size, EMPTY, dtype=np.int8)
+    moves = np.asarray(moves, dtype=np.intp)
+    flat[moves[0::2]] = RED
+    flat[moves[1::2]] = BLUE
+    return flat.reshape(size, size)
+
+
+def moves_to_dicts(moves, size):
+    """Expand a move record into the verbose [{'player', 'row', 'col', 'move_number'}] list"""
+    rows, cols = np.divmod(np.asarray(moves, dtype=np.intp), size)
+    return [{
+        'player': _PLAYER_NAMES[i % 2],
+        'row': row,
+        'col': col,
+        'move_number': i + 1
+    } for i, (row, col) in enumerate(zip(rows.tolist(), cols.tolist()))]
@@ -0,0 +1,175 @@
+from functools import lru_cache
+
+import numpy as np
+
+import instrumentation
+from board import EMPTY, RED, BLUE
+
+# neighbourhood value of an off-board cell that lies beyond two edges of different colours
+OFF = 3
+
+# the six neighbours in cyclic order: consecutive entries (and the last and first) are adjacent
+RING = ((-1, 0), (-1, 1), (0, 1), (1, 0), (1, -1), (0, -1))
+
+
+def _other(color):
+    return BLUE if color == RED else RED
+
+
+def _connected_on_ring(ring, color):
+    """True if the neighbours of color form at most one run of consecutive ring entries"""
+    runs = sum(ring[k] == color and ring[k - 1] != color for k in range(6))
+    return runs <= 1
+
+
+@lru_cache(maxsize=None)
+def dead_table():
+    """
+    Dead-cell patterns, indexed by neighbourhood mask.
+
+    The mask of a cell holds 2 bits per RING entry: EMPTY, RED, BLUE, or OFF. Off-board
+    neighbours beyond the top/bottom rows count as RED (the edge is RED's), beyond the
+    left/right columns as BLUE.
+    An empty cell is dead when, however its empty neighbours get filled, the RED neighbours
+    and the BLUE neighbours each form a single run around it. Any chain through the cell then
+    has a way around it over the run, so the cell's colour can never change the winner and
+    playing it is never better than any other move.
+
+    :return: np.bool_ array of 4096 entries
+    """
+    table = np.zeros(4 ** 6, dtype=np.bool_)
+    for mask in range(4 ** 6):
+        ring = [(mask >> (2 * k)) & 3 for k in range(6)]
+        empty = [k for k in range(6) if ring[k] == EMPTY]
+        dead = True
+        for fill in range(1 << len(empty)):
+            for j, k in enumerate(empty):
+                ring[k] = BLUE if fill >> j & 1 else RED
+            if not (_connected_on_ring(ring, RED) and _connected_on_ring(ring, BLUE)):
+                dead = False
+                break
+        table[mask] = dead
+    table.flags.writeable = False
+    return table
+
+
+def padded_grid(grid):
+    """
+    Flat copy of grid inside a one-cell border: RED above and below, BLUE left and right,
+    OFF in the corners. Off-board cells are never EMPTY, and the neighbour of padded cell i
+    in RING direction k is i + ring_offsets(size)[k].
+    """
+    n = len(grid)
+    padded = np.full((n + 2, n + 2), OFF, dtype=np.int64)
+    padded[0, 1:n + 1] = padded[n + 1, 1:n + 1] = RED
+    padded[1:n + 1, 0] = padded[1:n + 1, n + 1] = BLUE
+    padded[1:n + 1, 1:n + 1] = grid
+    return padded.ravel()
+
+
+@lru_cache(maxsize=None)
+def ring_offsets(size):
+    return tuple(dr * (size + 2) + dc for dr, dc in RING)
+
+
+def neighbourhood_masks(padded, cells, size):
+    """
+    RING neighbourhood masks (see dead_table)
+    :param padded: padded_grid
+    :param cells: padded indices of the cells
+    :return: int array, the mask of every cell
+    """
+    masks = np.zeros(len(cells), dtype=np.int64)
+    for k, offset in enumerate(ring_offsets(size)):
+        masks |= padded[cells + offset] << (2 * k)
+    return masks
+
+
+def _captured_pairs(padded, empty, masks, size, color):
+    """
+    Disjoint pairs of adjacent empty cells captured by color: once color owns one cell of
+    the pair, the other one is dead. If the opponent plays into the pair, color answers
+    with the other cell and owns both as far as the game is concerned, so the pair can be
+    filled with color. (Bridges to an edge, and cells squeezed between stones and an edge,
+    are caught by this.)
+
+    :param empty: padded indices of the empty cells
+    :param masks: padded-size array holding the neighbourhood mask of every empty cell
+    :return: list of (a, b) padded indices
+    """
+    dead = dead_table()
+    # each unordered pair once: b is a's neighbour in RING direction k < 3, a is b's in k + 3
+    k = np.tile(np.arange(3), len(empty))
+    a = np.repeat(empty, 3)
+    b = a + np.array(ring_offsets(size)[:3])[k]
+    paired = padded[b] == EMPTY
+    a, b, k = a[paired], b[paired], k[paired]
+
+    a_slot, b_slot = 2 * k, 2 * (k + 3)
+    a_dead = dead[masks[a] & ~(3 << a_slot) | (color << a_slot)]
+    b_dead = dead[masks[b] & ~(3 << b_slot) | (color << b_slot)]
+    captured = a_dead & b_dead
+    candidates = zip(a[captured].tolist(), b[captured].tolist())
+
+    pairs = []
+    taken = set()
+    for a, b in candidates:
+        if a not in taken and b not in taken:
+            taken.update((a, b))
+            pairs.append((a, b))
+    return pairs
+
+
+def candidate_mask(grid, color):
+    """
+    Empty cells worth considering for a move of color: every empty cell except the dead ones
+    and the ones captured by the opponent.
+
+    The analysis fills the board with the opponent's colour step by step: dead cells and
+    opponent-captured pairs are filled, which can make more cells dead, until nothing changes.
+    Only opponent stones are added, so a move that wins for color right away is never pruned.
+    If every empty cell is pruned (the game is decided already), all of them are returned.
+    Results are cached by position, so players asking again for the same board pay nothing.
+
+    :param grid: 2D array of EMPTY/RED/BLUE
+    :param color: colour to move
+    :return: read-only np.bool_ array of the grid's shape
+    """
+    grid = np.asarray(grid, dtype=np.int8)
+    return _candidate_mask(grid.tobytes(), len(grid), color)
+
+
+def clear_cache():
+    _candidate_mask.cache_clear()
+
+
+@lru_cache(maxsize=4096)
+@instrumentation.timed('inferior_cells')
+def _candidate_mask(cells, n, color):
+    padded = padded_grid(np.frombuffer(cells, dtype=np.int8).reshape(n, n))
+    opponent = _other(color)
+    dead = dead_table()
+    masks = np.zeros(len(padded), dtype=np.int64)
+
+    all_empty = empty = np.flatnonzero(padded == EMPTY)
+    while len(empty):
+        masks[empty] = neighbourhood_masks(padded, empty, n)
+        filled = empty[dead[masks[empty]]].tolist()
+        for pair in _captured_pairs(padded, empty, masks, n, opponent):
+            filled.extend(pair)
+        if not filled:
+            break
+        padded[filled] = opponent
+        empty = empty[padded[empty] == EMPTY]
+
+    if not len(empty):
+        # everything is decided, any move will do
+        empty = all_empty
+    elif instrumentation.enabled:
+        instrumentation.count('inferior_cells.pruned', len(all_empty) - len(empty))
+
+    candidates = np.zeros(len(padded), dtype=np.bool_)
+    candidates[empty] = True
+    candidates = candidates.reshape(n + 2, n + 2)[1:n + 1, 1:n + 1]
+    candidates.flags.writeable = False
+    return candidates
@@ -0,0 +1,164 @@
+"""
+Opt-in counters and timers for the hot paths (move latency, BFS, database lookups, Tournament).
+
+Everything is off by default and every hook first checks the module flag `enabled`,
+so a disabled hook costs one global lookup:
+
+    import instrumentation
+    instrumentation.enable()
+    Tournament(1000, red_player_class=GreedyAI(...)).run_multiple_games()
+    print(instrumentation.snapshot())
+    instrumentation.dump_json("profile.json")
+
+Data is kept per process, games played in Tournament worker processes are not counted.
+"""
+import json
+import math
+import time
+from functools import wraps
+
+enabled = False
+
+# name -> [calls, seconds]
+_timers = {}
+# name -> count
+_counters = {}
+# name -> LatencyHistogram
+_histograms = {}
+
+
+class LatencyHistogram:
+    """
+    Latencies in power-of-two microsecond buckets: bucket b holds the samples
+    in [2^(b-1), 2^b) us, bucket 0 everything below 1 us.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = seconds * 1e6
+        bucket = 0 if micros < 1 else int(micros).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """upper bound (seconds) of the bucket holding the q-th percentile, q in [0, 100]"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2 ** bucket / 1e6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else 0.0,
+            'min_seconds': self.min if self.count else 0.0,
+            'max_seconds': self.max,
+            'p50_seconds': self.percentile(50),
+            'p90_seconds': self.percentile(90),
+            'p99_seconds': self.percentile(99),
+            # upper bound in microseconds -> samples
+            'buckets_us': {str(2 ** b): n for b, n in sorted(self.buckets.items())}
+        }
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    """drop everything recorded so far"""
+    _timers.clear()
+    _counters.clear()
+    _histograms.clear()
+
+
+def count(name, n=1):
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def add_time(name, seconds, calls=1):
+    if enabled:
+        timer = _timers.setdefault(name, [0, 0.0])
+        timer[0] += calls
+        timer[1] += seconds
+
+
+def record_latency(name, seconds):
+    if enabled:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = LatencyHistogram()
+        histogram.add(seconds)
+
+
+def timed(name):
+    """Decorator adding the calls and the time spent in the function to timer `name` when enabled"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """
+    Everything recorded so far.
+
+    Returns:
+        dict: {'timers': {name: {calls, seconds, mean_seconds}},
+               'counters': {name: count},
+               'latency': {name: histogram dict},
+               'rates': {name: per second}} with the rates derived from matching
+              '<name>' counters and '<name>' timers (e.g. tournament.games / tournament.seconds)
+    """
+    timers = {name: {'calls': calls, 'seconds': seconds,
+                     'mean_seconds': seconds / calls if calls else 0.0}
+              for name, (calls, seconds) in _timers.items()}
+
+    rates = {}
+    for name, value in _counters.items():
+        prefix = name.rsplit('.', 1)[0]
+        timer = _timers.get(prefix)
+        if timer and timer[1] > 0:
+            rates[f"{name}_per_second"] = value / timer[1]
+
+    return {
+        'timers': timers,
+        'counters': dict(_counters),
+        'latency': {name: histogram.to_dict() for name, histogram in _histograms.items()},
+        'rates': rates
+    }
+
+
+def dump_json(filename):
+    with open(filename, "w") as f:
+        json.dump(snapshot(), f, indent=2)
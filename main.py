@@ -54,7 +54,7 @@ def main():
         example_key = list(board_database.keys())[0]
         score, count = board_database[example_key]
         print(f"\nExample board state:")
-        print(f"  Key: {example_key[:30]}...")
+        print(f"  Key: {example_key}")
         print(f"  Average score: {score:.4f}")
         print(f"  Times seen: {count}")
     """
@@ -64,10 +64,12 @@ def main():
     # ==============
 
     # Setup players
+    # AIs that load a database are passed as factories, the controller builds them
+    # in the background so the window shows up right away
     database_path = r"board_database_100_000_games_greedy.json"
     #red_player = RandomAI()
     red_player = HumanPlayer()
-    blue_player = HeuristicAI(database_path, BLUE)
+    blue_player = lambda: HeuristicAI(database_path, BLUE)
     #blue_player = HumanPlayer()
 
     # Create Qt application
@@ -77,7 +79,8 @@ def main():
     controller = GameController(
         board_size=7,
         red_player=red_player,
-        blue_player=blue_player
+        blue_player=blue_player,
+        think_time=None  # seconds per AI move, None = no limit
     )
 
     # Create UI (View)
@@ -0,0 +1,353 @@
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from bitboard import BitBoard
+from board import RED, BLUE
+from player import Player
+
+
+def _other(color):
+    return BLUE if color == RED else RED
+
+
+class Node:
+    """
+    One position of the search tree.
+    wins are counted for `player`, the colour that made `move` to reach this node.
+    """
+
+    __slots__ = ('move', 'player', 'parent', 'children', 'untried', 'wins', 'visits')
+
+    def __init__(self, move, player, parent, untried):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = {}
+        self.untried = untried
+        self.wins = 0.0
+        self.visits = 0
+
+    def select_child(self, exploration):
+        """UCT: best average result plus an exploration bonus for rarely visited children"""
+        log_visits = math.log(self.visits)
+        return max(self.children.values(),
+                   key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+def select_and_expand(root, state, exploration):
+    """
+    Walk down from root with UCT and add one new child.
+    :return: (node, leaf) with leaf a copy of state with the node's moves played
+    """
+    node = root
+    leaf = state.copy()
+    W = leaf._width
+
+    # selection
+    while not node.untried and node.children:
+        node = node.select_child(exploration)
+        leaf.place(*divmod(node.move, W), node.player)
+
+    # expansion
+    if node.untried:
+        move = node.untried.pop()
+        player = _other(node.player)
+        leaf.place(*divmod(move, W), player)
+        # the child's moves: everything the parent had except move
+        untried = node.untried + list(node.children)
+        random.shuffle(untried)
+        child = Node(move, player, node, untried)
+        node.children[move] = child
+        node = child
+
+    return node, leaf
+
+
+def backpropagate(node, red_wins, count):
+    """add count playouts, red_wins of them won by RED, to node and its ancestors"""
+    while node is not None:
+        node.visits += count
+        node.wins += red_wins if node.player == RED else count - red_wins
+        node = node.parent
+
+
+def playout(root, state, exploration):
+    """one selection / expansion / rollout / backpropagation pass from root on a copy of state"""
+    node, leaf = select_and_expand(root, state, exploration)
+
+    # rollout: random fill of the rest of the board
+    winner = leaf.rollout(_other(node.player))
+    backpropagate(node, int(winner == RED), 1)
+
+
+def new_root(state, to_move, prune=False):
+    """
+    root node of a fresh tree for state with to_move to play. With prune, dead and captured
+    cells (see BitBoard.candidate_cells) are left out of the tree, the rollouts still fill them.
+    """
+    cells = state.candidate_cells(to_move) if prune else state.empty_cells()
+    moves = [r * state._width + c for r, c in cells]
+    random.shuffle(moves)
+    return Node(None, _other(to_move), None, moves)
+
+
+def search(root, state, time_budget, playouts, exploration):
+    """
+    Run playouts from root until the time budget (seconds) or the playout budget runs out
+    (None = no limit, at least one playout is always made).
+
+    :return: number of playouts made
+    """
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    count = 0
+    while count == 0 or (playouts is None or count < playouts) and \
+            (deadline is None or time.perf_counter() < deadline):
+        playout(root, state, exploration)
+        count += 1
+    return count
+
+
+class MCTSPlayer(Player):
+    def __init__(self, color, time_budget=1.0, playouts=None, exploration=1.4, prune=False):
+        """
+        Monte Carlo Tree Search player.
+
+        Every get_move searches until the time budget (seconds) or the playout budget runs
+        out, whichever comes first; set one of them to None to only use the other.
+        Playouts are random fills of a BitBoard copy (see BitBoard.rollout), and the subtree
+        under the position actually reached is kept for the next call.
+
+        :param color: RED or BLUE
+        :param time_budget: seconds per move, or None
+        :param playouts: playouts per move, or None
+        :param exploration: UCT exploration constant
+        :param prune: leave dead and captured cells out of the tree (see new_root)
+        """
+        if time_budget is None and playouts is None:
+            raise ValueError("MCTSPlayer needs a time_budget or a playouts budget")
+
+        self.color = color
+        self.time_budget = time_budget
+        self.playouts = playouts
+        self.exploration = exploration
+        self.prune = prune
+
+        self._root = None
+        self._root_board = None
+
+        # statistics of the last get_move
+        self.last_stats = {}
+
+    def get_move(self, board):
+        start = time.perf_counter()
+        state = BitBoard.from_grid(board.grid)
+        root = self._reuse_root(state)
+        reused = root.visits
+
+        playouts = search(root, state, self.time_budget, self.playouts, self.exploration)
+
+        best = max(root.children.values(), key=lambda child: child.visits)
+        elapsed = time.perf_counter() - start
+
+        # keep the subtree of the chosen move for the next call
+        best.parent = None
+        self._root = best
+        self._root_board = state.copy()
+        self._root_board.place(*self._cell(state, best.move), self.color)
+
+        self.last_stats = {
+            'playouts': playouts,
+            'seconds': elapsed,
+            'playouts_per_second': playouts / elapsed if elapsed > 0 else 0.0,
+            'reused_visits': reused,
+            'win_rate': best.wins / best.visits
+        }
+
+        return self._cell(state, best.move)
+
+    @staticmethod
+    def _cell(state, move):
+        return divmod(move, state._width)
+
+    def _reuse_root(self, state):
+        """
+        Find the node of the current position under the previous root: the previous root is
+        the position after our last move, so the current one is a child of it when the
+        opponent played a single move since then.
+        """
+        root, previous = self._root, self._root_board
+        self._root = self._root_board = None
+
+        if root is None or previous.size != state.size:
+            return new_root(state, self.color, self.prune)
+
+        occupied = state.red | state.blue
+        added = occupied & ~(previous.red | previous.blue)
+        if occupied & (previous.red | previous.blue) != previous.red | previous.blue or \
+                added & (added - 1) or not added:
+            return new_root(state, self.color, self.prune)
+
+        move = added.bit_length() - 1
+        child = root.children.get(move)
+        opponent_bits = state.red if self.color == BLUE else state.blue
+        if child is None or not opponent_bits & added:
+            return new_root(state, self.color, self.prune)
+
+        child.parent = None
+        return child
+
+
+def _bitboard(size, red, blue):
+    state = BitBoard(size)
+    state.red, state.blue = red, blue
+    return state
+
+
+def _root_search(size, red, blue, to_move, time_budget, playouts, exploration, prune, seed):
+    """worker task of root parallelism: an independent search, returns {move: (visits, wins)}"""
+    random.seed(seed)
+    state = _bitboard(size, red, blue)
+    root = new_root(state, to_move, prune)
+    search(root, state, time_budget, playouts, exploration)
+    return {move: (child.visits, child.wins) for move, child in root.children.items()}
+
+
+def _leaf_rollouts(size, red, blue, to_move, count, seed):
+    """worker task of leaf parallelism: count rollouts of one leaf, returns RED wins"""
+    random.seed(seed)
+    state = _bitboard(size, red, blue)
+    return sum(state.rollout(to_move) == RED for _ in range(count))
+
+
+class ParallelMCTSPlayer(Player):
+    def __init__(self, color, workers=None, time_budget=1.0, playouts=None, mode='root',
+                 leaf_batch=16, exploration=1.4, prune=False):
+        """
+        Monte Carlo Tree Search on several processes.
+
+        mode='root': every worker grows its own tree from the current position for the whole
+                     budget, and the root children's visit counts are summed to pick the move.
+        mode='leaf': one tree in this process; each selected leaf is evaluated with
+                     leaf_batch rollouts on every worker.
+
+        The process pool is created on the first get_move and kept until close() (or the
+        end of a with block), so there is no start-up cost per move.
+
+        :param color: RED or BLUE
+        :param workers: number of processes (default: all cores)
+        :param time_budget: seconds per move, or None
+        :param playouts: playouts per move in total over all workers, or None
+        :param mode: 'root' or 'leaf'
+        :param leaf_batch: rollouts per worker per leaf (leaf mode)
+        :param exploration: UCT exploration constant
+        :param prune: leave dead and captured cells out of the tree (see new_root)
+        """
+        if time_budget is None and playouts is None:
+            raise ValueError("ParallelMCTSPlayer needs a time_budget or a playouts budget")
+        if mode not in ('root', 'leaf'):
+            raise ValueError(f"Unknown mode: {mode}")
+
+        self.color = color
+        self.workers = workers or os.cpu_count()
+        self.time_budget = time_budget
+        self.playouts = playouts
+        self.mode = mode
+        self.leaf_batch = leaf_batch
+        self.exploration = exploration
+        self.prune = prune
+
+        self._pool = None
+
+        # statistics of the last get_move
+        self.last_stats = {}
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers)
+        return self._pool
+
+    def close(self):
+        """shut the worker processes down"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __getstate__(self):
+        # the pool stays with the process that created it
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_move(self, board):
+        start = time.perf_counter()
+        state = BitBoard.from_grid(board.grid)
+
+        if self.mode == 'root':
+            move, visits, playouts = self._root_parallel(state)
+        else:
+            move, visits, playouts = self._leaf_parallel(state)
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            'playouts': playouts,
+            'seconds': elapsed,
+            'playouts_per_second': playouts / elapsed if elapsed > 0 else 0.0,
+            'visits': visits,
+            'workers': self.workers
+        }
+
+        return divmod(move, state._width)
+
+    def _root_parallel(self, state):
+        per_worker = None if self.playouts is None else max(1, self.playouts // self.workers)
+        seeds = [random.randrange(2 ** 32) for _ in range(self.workers)]
+        tasks = [(state.size, state.red, state.blue, self.color, self.time_budget,
+                  per_worker, self.exploration, self.prune, seed) for seed in seeds]
+
+        merged = {}
+        for children in self._get_pool().starmap(_root_search, tasks):
+            for move, (visits, wins) in children.items():
+                total = merged.setdefault(move, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+
+        move = max(merged, key=lambda m: merged[m][0])
+        playouts = sum(visits for visits, _ in merged.values())
+        return move, merged[move][0], playouts
+
+    def _leaf_parallel(self, state):
+        root = new_root(state, self.color, self.prune)
+        pool = self._get_pool()
+
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        playouts = 0
+        while playouts == 0 or (self.playouts is None or playouts < self.playouts) and \
+                (deadline is None or time.perf_counter() < deadline):
+            node, leaf = select_and_expand(root, state, self.exploration)
+
+            # batched rollouts of the leaf on every worker, the last batch only fills the budget
+            counts = [self.leaf_batch] * self.workers
+            if self.playouts is not None and self.playouts - playouts < sum(counts):
+                share, extra = divmod(self.playouts - playouts, self.workers)
+                counts = [share + (i < extra) for i in range(self.workers) if share + (i < extra)]
+
+            to_move = _other(node.player)
+            tasks = [(leaf.size, leaf.red, leaf.blue, to_move, count, random.randrange(2 ** 32))
+                     for count in counts]
+            red_wins = sum(pool.starmap(_leaf_rollouts, tasks))
+            backpropagate(node, red_wins, sum(counts))
+            playouts += sum(counts)
+
+        best = max(root.children.values(), key=lambda child: child.visits)
+        return best.move, best.visits, playouts
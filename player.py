@@ -1,6 +1,11 @@
 import random
-from board import Board, EMPTY, BLUE, RED
+
+import numpy as np
+
+from board import EMPTY, BLUE, RED, _zobrist_rows
 from DatabaseHandler import DatabaseHandler
+import instrumentation
+from distance import DistanceCache
 
 
 class Player:
@@ -25,55 +30,66 @@ class RandomAI(Player):
 
 
 class GreedyAI(Player):
-    def __init__(self, database_path, color, gama=0.9):
+    def __init__(self, database_path, color, gama=0.9, prune=False):
         """
-        :param database: <flattened_board> : (score, num_of_occurrences)
+        :param database_path: JSON or binary database in game_database/, opened through the
+                              shared DatabaseHandler.open_database backend ({key: (score, num_of_occurrences)})
+        :param prune: only look up board.candidate_cells, not every empty cell (pays off when
+                      lookups are slower than the analysis, e.g. on big boards)
         """
-        self.database = DatabaseHandler.load_board_database(database_path)
+        self.database = DatabaseHandler.open_database(database_path)
         self.color = color
         self.gama = gama
+        self.prune = prune
 
-    def get_move(self, board):
-        best_score = None
-        best_move = None
-
-        for r, c in board.empty_cells():
-            # Create board copy
-            temp = Board(board.size)
-            temp.grid = board.grid.copy()
-
-            # Apply move
-            temp.place(r, c, self.color)
-
-            # Lookup board score
-            key = str(temp.grid.flatten().tolist())
-
-            if key in self.database:
-                score, _ = self.database[key]
+        # lookup statistics
+        self.lookups = 0
+        self.hits = 0
 
-            #if unknown
-            else:
-                score = 0.5
+    def hit_rate(self):
+        """share of position lookups found in the database"""
+        return self.hits / self.lookups if self.lookups else 0.0
 
-            # Greedy choice
-            if best_move is None:
-                best_score = score
-                best_move = (r, c)
-            else:
-                if score > best_score:
-                    best_score = score
-                    best_move = (r, c)
+    def get_move(self, board):
+        # canonical keys of all the positions after one of our moves, looked up in one batch
+        cells, keys = board.child_keys(self.color, canonical=True)
+        if self.prune:
+            # leave out dead cells and cells the opponent has captured
+            candidates = board.candidate_mask(self.color).ravel()
+            cells, keys = zip(*[(cell, key) for cell, key in zip(cells, keys) if candidates[cell]])
+        entries = self.database.get_many(keys)
+
+        hits = sum(entry is not None for entry in entries)
+        self.lookups += len(entries)
+        self.hits += hits
+        if instrumentation.enabled:
+            instrumentation.count('database.hits', hits)
+            instrumentation.count('database.misses', len(entries) - hits)
+
+        # unknown positions score 0.5
+        scores = [0.5 if entry is None else entry[0] for entry in entries]
+
+        # Greedy choice (first best cell on ties)
+        best_move = divmod(cells[int(np.argmax(scores))], board.size)
 
         # return the best move 90% of the time
         if random.random() < self.gama:
             return best_move
-        return random.choice(board.empty_cells())
+        return divmod(random.choice(cells), board.size)
 
 
 class HeuristicAI(Player):
-    def __init__(self, database_path, color):
-        self._greedy = GreedyAI(database_path, color)
+    # min_total of positions already evaluated, shared by every HeuristicAI
+    distance_cache = DistanceCache()
+
+    def __init__(self, database_path, color, prune=False):
+        """
+        :param prune: only consider board.candidate_cells, not every empty cell
+                      (skips dead and captured cells, at the cost of the analysis per position)
+        """
+        self._greedy = GreedyAI(database_path, color, prune=prune)
         self.color = color
+        self.prune = prune
         self.opponent = RED if color == BLUE else BLUE
 
     def get_move(self, board):
@@ -102,12 +118,8 @@ class HeuristicAI(Player):
         3. if opponent is at distance 2 from the end of the board, block it's shortest rout to
         let us block the path  completely later.
         """
-        if self.color == BLUE:
-            my_min_distance, _, _ = board.blue_distances()
-            opponent_min_distance, _, _ = board.red_distances()
-        else:
-            my_min_distance, _, _ = board.red_distances()
-            opponent_min_distance, _, _ = board.blue_distances()
+        my_min_distance = self._min_distance(board, self.color)
+        opponent_min_distance = self._min_distance(board, self.opponent)
 
         # Rule 1: win immediately
         if my_min_distance == 1:
@@ -127,10 +139,9 @@ class HeuristicAI(Player):
         """
         Return a move that immediately wins the game, or None
         """
-        for r, c in board.empty_cells():
+        for r, c in self._moves(board, color):
             # simulate move
-            temp = Board(board.size)
-            temp.grid = board.grid.copy()
+            temp = board.copy()
             temp.place(r, c, color)
 
             # check win
@@ -198,21 +209,9 @@ class HeuristicAI(Player):
         if board.grid[r, c] != EMPTY:
             return True
 
-        # distance before move
-        if self.color == BLUE:
-            dist_before, _, _ = board.blue_distances()
-        else:
-            dist_before, _, _ = board.red_distances()
-
-        # distance after move
-        temp = Board(board.size)
-        temp.grid = board.grid.copy()
-        temp.place(r, c, self.color)
-
-        if self.color == BLUE:
-            dist_after, _, _ = temp.blue_distances()
-        else:
-            dist_after, _, _ = temp.red_distances()
+        # distance before and after the move
+        dist_before = self._min_distance(board, self.color)
+        dist_after = self._child_distance(board, r, c, _LazyField(board, self.color))
 
         # pocket (meaningless move)
         if dist_after is None:
@@ -230,18 +229,52 @@ class HeuristicAI(Player):
         best_move = None
         best_dist = float('inf')
 
-        for r, c in board.empty_cells():
-            temp = Board(board.size)
-            temp.grid = board.grid.copy()
-            temp.place(r, c, self.color)
+        field = _LazyField(board, self.color)
 
-            if self.color == BLUE:
-                dist, _, _ = temp.blue_distances()
-            else:
-                dist, _, _ = temp.red_distances()
+        for r, c in self._moves(board, self.color):
+            dist = self._child_distance(board, r, c, field)
 
             if dist is not None and dist < best_dist:
                 best_dist = dist
                 best_move = (r, c)
 
-        return best_move
\ No newline at end of file
+        return best_move
+
+    def _moves(self, board, color):
+        """cells to try for a move of color"""
+        return board.candidate_cells(color) if self.prune else board.empty_cells()
+
+    def _min_distance(self, board, color):
+        """min_total of color on board, through the shared distance cache"""
+        return HeuristicAI.distance_cache.get(
+            board.size, board.hash, color,
+            lambda: board.distance_field(color).min_total)
+
+    def _child_distance(self, board, r, c, field):
+        """
+        min_total of our colour after our stone on (r, c), through the shared distance cache.
+        The child's hash is the parent's XOR the stone's Zobrist number, so no board is built;
+        on a miss the parent's distance field is updated incrementally.
+        """
+        child_hash = board.hash ^ _zobrist_rows(board.size)[r * board.size + c][self.color]
+
+        def compute():
+            temp = field.get().copy()
+            temp.place(r, c, self.color)
+            return temp.min_total
+
+        return HeuristicAI.distance_cache.get(board.size, child_hash, self.color, compute)
+
+
+class _LazyField:
+    """distance field of a board, only computed the first time it is needed"""
+
+    def __init__(self, board, color):
+        self._board = board
+        self._color = color
+        self._field = None
+
+    def get(self):
+        if self._field is None:
+            self._field = self._board.distance_field(self._color)
+        return self._field
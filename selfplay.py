@@ -0,0 +1,110 @@
+import numpy as np
+
+from board import RED, BLUE
+from gamerecord import move_array, final_grid
+
+
+def result_from_moves(moves, winner, size):
+    """
+    Build a Game.play style result from a flat move list (cell r * size + c, RED first).
+
+    Args:
+        moves: sequence of flat cell indices, the last one ends the game
+        winner: RED or BLUE
+        size: board size
+
+    Returns:
+        dict: winner, board_size, total_moves, moves (compact array), final_board
+    """
+    moves = move_array(moves)
+    return {
+        'winner': 'RED' if winner == RED else 'BLUE',
+        'board_size': size,
+        'total_moves': len(moves),
+        'moves': moves,
+        'final_board': final_grid(moves, size).tolist()
+    }
+
+
+def _connection_times(order, own, start_edge, width, never):
+    """
+    Ply at which own stones first connect each cell to the start edge (label propagation).
+
+    A path is complete at the ply of its latest stone, so a cell's time is the smallest,
+    over paths of own stones from the start edge, of the largest order on the path
+    (a bottleneck shortest path): time = max(order, min(neighbour times)), iterated
+    until nothing changes. Cells that never get connected stay at never.
+
+    Boards are stored cells-first as (L, K) arrays with one padding column per row
+    (L = n * width, width = n + 1), so every hex neighbour is a fixed offset along
+    axis 0 and each shift is a contiguous slice over all K games. Padding cells are
+    never own stones, which stops shifts wrapping across rows.
+    """
+    offsets = (1, width, width - 1)
+    times = np.where(own & start_edge[:, None], order, never)
+    while True:
+        nearest = times.copy()
+        for k in offsets:
+            np.minimum(nearest[k:], times[:-k], out=nearest[k:])
+            np.minimum(nearest[:-k], times[k:], out=nearest[:-k])
+        grown = np.where(own, np.maximum(order, nearest), never)
+        if np.array_equal(grown, times):
+            return times
+        times = grown
+
+
+def play_random_games(num_games, board_size, batch_size=1024, rng=None):
+    """
+    Play RandomAI vs RandomAI games K at a time in numpy arrays holding all K boards.
+
+    Playing uniformly random empty cells is the same as filling the board in a uniformly
+    random order, so every game draws one permutation of the cells up front (RED plays
+    the even plies). The full board has exactly one winner, and the game ends on the ply
+    where the winner's stones first connect its edges; both are read from the connection
+    times of each colour (see _connection_times), computed once per batch instead of a
+    win check after every ply.
+
+    Args:
+        num_games: number of games to play
+        board_size: board size
+        batch_size: games advanced together
+        rng: numpy Generator (default: a fresh default_rng())
+
+    Yields:
+        dict: same result format as Game.play (winner, board_size, total_moves,
+              moves, final_board)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    n = board_size
+    W = n + 1
+    L = n * W
+    never = n * n
+
+    cell_row, cell_col = np.divmod(np.arange(L), W)
+    padding = cell_col == n
+    start_edge = {RED: (cell_row == 0) & ~padding, BLUE: cell_col == 0}
+    end_edge = {RED: (cell_row == n - 1) & ~padding, BLUE: cell_col == n - 1}
+    # flat cell r * n + c -> padded cell r * W + c
+    padded_cell = np.flatnonzero(~padding)
+
+    for start in range(0, num_games, batch_size):
+        K = min(batch_size, num_games - start)
+
+        # moves[g, ply] = flat cell played at ply, order = ply of every padded cell
+        moves = rng.permuted(np.broadcast_to(np.arange(n * n), (K, n * n)), axis=1)
+        order = np.full((L, K), never, dtype=np.int32)
+        order[padded_cell[moves], np.arange(K)[:, None]] = np.arange(n * n)
+        red = (order % 2 == 0) & ~padding[:, None]
+
+        end = {}
+        for color, own in ((RED, red), (BLUE, ~red & ~padding[:, None])):
+            times = _connection_times(order, own, start_edge[color], W, never)
+            end[color] = times[end_edge[color]].min(axis=0)
+
+        winners = np.where(end[RED] < end[BLUE], RED, BLUE)
+        lengths = np.minimum(end[RED], end[BLUE]) + 1
+
+        for g in range(K):
+            yield result_from_moves(moves[g, :lengths[g]], winners[g], n)
@@ -0,0 +1,120 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from gamerecord import move_array
+
+
+class ResultSink:
+    """
+    Receiver of game results streamed by Tournament.iter_games.
+    add() is called once per finished game, in game order; close() once the caller is done.
+    flush() is called before a checkpoint records the results added so far as done.
+    """
+
+    def add(self, result):
+        raise NotImplementedError
+
+    def flush(self):
+        """make the results added so far durable"""
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StatsAccumulator(ResultSink):
+    """
+    Constant-memory summary of a run: winners tally and game length statistics.
+    With report_every, report(summary()) is called every report_every games,
+    e.g. report=print for a running progress line.
+    """
+
+    def __init__(self, report_every=None, report=print):
+        self.report_every = report_every
+        self.report = report
+
+        self.games = 0
+        self.winners = {
+            'RED': 0,
+            'BLUE': 0,
+            'Tie': 0
+        }
+        self.total_moves = 0
+        self.min_moves = None
+        self.max_moves = 0
+
+    def add(self, result):
+        self.games += 1
+        self.winners[result['winner']] += 1
+
+        moves = result['total_moves']
+        self.total_moves += moves
+        self.min_moves = moves if self.min_moves is None else min(self.min_moves, moves)
+        self.max_moves = max(self.max_moves, moves)
+
+        if self.report_every and self.games % self.report_every == 0:
+            self.report(self.summary())
+
+    def summary(self):
+        return {
+            'games': self.games,
+            'winners': dict(self.winners),
+            'average_moves': self.total_moves / self.games if self.games else 0.0,
+            'min_moves': self.min_moves,
+            'max_moves': self.max_moves
+        }
+
+
+class JsonLinesWriter(ResultSink):
+    """
+    Write every result as one JSON line to game_database/<filename> as it arrives,
+    with the move array stored as a list of flat cells.
+    Nothing is kept in memory, the file can be read back with read_results.
+    """
+
+    def __init__(self, filename="Hex_database_result.jsonl", append=False):
+        """
+        :param filename: file in game_database/
+        :param append: add to an existing file, e.g. when resuming a checkpointed run
+                       (the chunk that was interrupted is played again, so its lines can
+                       appear twice, with the same game_number)
+        """
+        output_dir = Path("game_database")
+        output_dir.mkdir(exist_ok=True)
+
+        self.filepath = output_dir / filename
+        self._file = open(self.filepath, "a" if append else "w")
+
+    def add(self, result):
+        json.dump({name: value.tolist() if isinstance(value, np.ndarray) else value
+                   for name, value in result.items()}, self._file)
+        self._file.write("\n")
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_results(filename="Hex_database_result.jsonl"):
+    """
+    Stream the results written by JsonLinesWriter back, one at a time
+    (moves as the compact array, see gamerecord)
+    """
+    with open(Path("game_database") / filename) as f:
+        for line in f:
+            result = json.loads(line)
+            result['moves'] = move_array(result['moves'])
+            yield result
@@ -1,10 +1,15 @@
 import math
+import time
 from PySide6.QtWidgets import QWidget, QMessageBox
 from PySide6.QtGui import QPainter, QPolygonF, QColor, QPen
-from PySide6.QtCore import Qt, QPointF, QTimer
+from PySide6.QtCore import Qt, QLineF, QPointF, QRectF, QTimer
 
 from board import RED, BLUE, EMPTY
 
+SQRT3 = math.sqrt(3)
+
+CELL_COLORS = {RED: QColor("red"), BLUE: QColor("blue"), EMPTY: QColor("white")}
+
 
 class HexWidget(QWidget):
     """
@@ -22,33 +27,108 @@ class HexWidget(QWidget):
         self.hex_radius = 30
         self.margin = 100
 
+        # Thinking / loading indicator, set by the controller
+        self.status_text = None
+        self.status_progress = None
+        self.status_rect = QRectF(10, 10, 320, 44)
+
         self.setWindowTitle("Hex")
         self.setMinimumSize(700, 700)
+        self.layout_board()
 
         # Start the game after UI is ready
         QTimer.singleShot(100, self.controller.start_game)
 
     # ---------- Geometry ----------
+    def resizeEvent(self, event):
+        self.layout_board()
+        super().resizeEvent(event)
+
+    def layout_board(self):
+        """
+        Precompute the hexagon of every cell and the border lines for the current widget size.
+        The radius shrinks (up to hex_radius) so that large boards fit the window.
+        """
+        n = self.size
+        width = self.width() - 2 * self.margin
+        height = self.height() - 2 * self.margin
+        R = min(self.hex_radius,
+                width / (SQRT3 * (1.5 * (n - 1) + 0.5)),
+                height / (1.5 * (n - 1) + 1))
+        self.radius = R = max(R, 4.0)
+
+        # pointy-top corners, starting at 30 degrees
+        corners = [QPointF(R * math.cos(math.radians(60 * i + 30)), R * math.sin(math.radians(60 * i + 30)))
+                   for i in range(6)]
+
+        self.centers = [[self.hex_center(r, c) for c in range(n)] for r in range(n)]
+        self.polygons = [[QPolygonF([center + corner for corner in corners]) for center in row]
+                         for row in self.centers]
+        # area repainted when a cell changes, padded for the antialiased outline
+        self.cell_rects = [[polygon.boundingRect().adjusted(-2, -2, 2, 2).toAlignedRect() for polygon in row]
+                           for row in self.polygons]
+        self.border_lines = self.border_segments()
+
     def hex_center(self, r, c):
         """Calculate hex center for diamond layout with pointy-top hexagons"""
-        R = self.hex_radius
+        R = self.radius
         # For pointy-top hexagons in diamond layout
-        x = self.margin + c * math.sqrt(3) * R + r * math.sqrt(3) * R / 2
+        x = self.margin + c * SQRT3 * R + r * SQRT3 * R / 2
         y = self.margin + r * 1.5 * R
         return QPointF(x, y)
 
-    def hex_polygon(self, center):
-        """Create a pointy-top hexagon"""
-        R = self.hex_radius
-        points = []
-        for i in range(6):
-            # Start at 30 degrees for pointy-top
-            angle = math.pi / 180 * (60 * i + 30)
-            points.append(QPointF(
-                center.x() + R * math.cos(angle),
-                center.y() + R * math.sin(angle)
-            ))
-        return QPolygonF(points)
+    def cell_at(self, pos):
+        """
+        (r, c) of the hexagon containing pos, or None: inverse of hex_center in axial
+        coordinates, rounded to the nearest hexagon in cube coordinates
+        """
+        R = self.radius
+        rf = (pos.y() - self.margin) / (1.5 * R)
+        cf = (pos.x() - self.margin) / (SQRT3 * R) - rf / 2
+        sf = -rf - cf
+
+        r, c, s = round(rf), round(cf), round(sf)
+        dr, dc, ds = abs(r - rf), abs(c - cf), abs(s - sf)
+        if dr > dc and dr > ds:
+            r = -c - s
+        elif dc > ds:
+            c = -r - s
+
+        if 0 <= r < self.size and 0 <= c < self.size:
+            return r, c
+        return None
+
+    def cells_in(self, rect):
+        """cells whose hexagon may intersect rect, found by rows instead of testing every cell"""
+        R = self.radius
+        w = SQRT3 * R
+        r_first = max(0, math.floor((rect.top() - self.margin - R) / (1.5 * R)))
+        r_last = min(self.size - 1, math.ceil((rect.bottom() - self.margin + R) / (1.5 * R)))
+        for r in range(r_first, r_last + 1):
+            c_first = max(0, math.floor((rect.left() - self.margin - w / 2) / w - r / 2))
+            c_last = min(self.size - 1, math.ceil((rect.right() - self.margin + w / 2) / w - r / 2))
+            for c in range(c_first, c_last + 1):
+                yield r, c
+
+    def border_segments(self):
+        """{color: [QLineF]} of the red borders on top/bottom and blue borders on left/right"""
+        n = self.size
+        red, blue = [], []
+        for c in range(n):
+            # RED: Top edge (upper-right diagonal)
+            poly = self.polygons[0][c]
+            red += [QLineF(poly[5], poly[4]), QLineF(poly[3], poly[4])]
+            # RED: Bottom edge (lower-left diagonal)
+            poly = self.polygons[n - 1][c]
+            red += [QLineF(poly[1], poly[2]), QLineF(poly[0], poly[1])]
+        for r in range(n):
+            # BLUE: Left edge (upper-left diagonal)
+            poly = self.polygons[r][0]
+            blue += [QLineF(poly[2], poly[3]), QLineF(poly[1], poly[2])]
+            # BLUE: Right edge (lower-right diagonal)
+            poly = self.polygons[r][n - 1]
+            blue += [QLineF(poly[5], poly[4]), QLineF(poly[5], poly[0])]
+        return {"red": red, "blue": blue}
 
     # ---------- Painting ----------
     def paintEvent(self, event):
@@ -58,61 +138,47 @@ class HexWidget(QWidget):
         # Get board state from controller
         board_grid = self.controller.get_board_state()
 
-        # Draw hexagons
-        for r in range(self.size):
-            for c in range(self.size):
-                center = self.hex_center(r, c)
-                poly = self.hex_polygon(center)
-
-                cell = board_grid[r, c]
-                if cell == RED:
-                    painter.setBrush(QColor("red"))
-                elif cell == BLUE:
-                    painter.setBrush(QColor("blue"))
-                else:
-                    painter.setBrush(QColor("white"))
-
-                painter.setPen(Qt.black)
-                painter.drawPolygon(poly)
+        # Draw only the hexagons in the repainted area
+        painter.setPen(Qt.black)
+        exposed = event.rect()
+        for r, c in self.cells_in(exposed):
+            cell = board_grid[r, c]
+            painter.setBrush(CELL_COLORS.get(cell, CELL_COLORS[EMPTY]))
+            painter.drawPolygon(self.polygons[r][c])
 
         # Draw colored borders
         self.draw_borders(painter)
 
+        self.draw_status(painter)
+
     def draw_borders(self, painter):
         """Draw red borders on top/bottom and blue borders on left/right"""
         border_width = 8
 
-        # RED: Top edge (upper-right diagonal)
-        pen = QPen(QColor("red"), border_width)
-        painter.setPen(pen)
-        for c in range(self.size):
-            center = self.hex_center(0, c)
-            poly = self.hex_polygon(center)
-            painter.drawLine(poly[5], poly[4])
-            painter.drawLine(poly[3], poly[4])
-
-        # RED: Bottom edge (lower-left diagonal)
-        for c in range(self.size):
-            center = self.hex_center(self.size - 1, c)
-            poly = self.hex_polygon(center)
-            painter.drawLine(poly[1], poly[2])
-            painter.drawLine(poly[0], poly[1])
-
-        # BLUE: Left edge (upper-left diagonal)
-        pen = QPen(QColor("blue"), border_width)
-        painter.setPen(pen)
-        for r in range(self.size):
-            center = self.hex_center(r, 0)
-            poly = self.hex_polygon(center)
-            painter.drawLine(poly[2], poly[3])
-            painter.drawLine(poly[1], poly[2])
-
-        # BLUE: Right edge (lower-right diagonal)
-        for r in range(self.size):
-            center = self.hex_center(r, self.size - 1)
-            poly = self.hex_polygon(center)
-            painter.drawLine(poly[5], poly[4])
-            painter.drawLine(poly[5], poly[0])
+        for color, lines in self.border_lines.items():
+            painter.setPen(QPen(QColor(color), border_width))
+            painter.drawLines(lines)
+
+    def draw_status(self, painter):
+        """Status text with a progress bar (a moving block when the progress is unknown)"""
+        if self.status_text is None:
+            return
+
+        rect = self.status_rect
+        painter.setPen(Qt.black)
+        painter.drawText(QRectF(rect.x(), rect.y(), rect.width(), 20), Qt.AlignLeft | Qt.AlignVCenter,
+                         self.status_text)
+
+        bar = QRectF(rect.x(), rect.y() + 26, rect.width(), 12)
+        painter.setBrush(QColor("white"))
+        painter.drawRect(bar)
+        painter.setBrush(QColor("gray"))
+        if self.status_progress is None:
+            block = bar.width() / 4
+            phase = (time.monotonic() % 1.5) / 1.5
+            painter.drawRect(QRectF(bar.x() + phase * (bar.width() - block), bar.y(), block, bar.height()))
+        else:
+            painter.drawRect(QRectF(bar.x(), bar.y(), bar.width() * self.status_progress, bar.height()))
 
     # ---------- Mouse handling ----------
     def mousePressEvent(self, event):
@@ -123,21 +189,36 @@ class HexWidget(QWidget):
         if not self.controller.is_game_active():
             return
 
-        pos = event.position()
-        for r in range(self.size):
-            for c in range(self.size):
-                center = self.hex_center(r, c)
-                poly = self.hex_polygon(center)
-
-                if poly.containsPoint(pos, Qt.OddEvenFill):
-                    # Delegate move to controller
-                    self.controller.place_tile(r, c)
-                    return
+        cell = self.cell_at(event.position())
+        if cell is not None:
+            # Delegate move to controller
+            self.controller.place_tile(*cell)
 
     # ---------- Slots (called by Controller) ----------
-    def update_display(self):
-        """Update the display - called by controller when board changes"""
-        self.update()
+    def update_display(self, cell=None):
+        """
+        Update the display - called by controller when board changes
+        :param cell: (r, c) of the move played, only its hexagon is repainted; None repaints everything
+        """
+        if cell is None:
+            self.update()
+        else:
+            r, c = cell
+            self.update(self.cell_rects[r][c])
+
+    def show_status(self, text, progress):
+        """
+        Show or clear (text=None) the status line - called by controller while an AI
+        thinks or players load. Only the status area is repainted.
+        :param progress: fraction done in [0, 1], or None if unknown
+        """
+        self.status_text = text
+        self.status_progress = progress
+        self.update(self.status_rect.toAlignedRect())
+
+    def closeEvent(self, event):
+        self.controller.shutdown()
+        super().closeEvent(event)
 
     def handle_game_over(self, winner):
         """Handle game over - called by controller"""